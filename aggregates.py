@@ -0,0 +1,214 @@
+"""
+Incremental day-level aggregates of the intraday report.
+
+Trading for an interval ends before its delivery starts, so once an
+interval is over its figures are final. The running totals therefore only
+ever fold in intervals that have ended since the previous run: the state
+(one JSON file per rendered page under data/aggregates/) remembers how
+many slots of the delivery day are already folded in, and a run touches
+only the slots after that. Ended slots the workbook has no data for yet
+(a stale download, or the daemon's last snapshot) are kept as pending and
+folded in once their data shows up. A new delivery day starts a fresh
+state.
+
+Figures: volume-weighted average price (sum of VP x ZM over sum of ZM),
+total traded / buy / sell MWh, and open/high/low/close, where open is the
+first interval's VP, high/low the extreme MaxC/MinC and close the latest
+interval's PC.
+"""
+import json
+import os
+from datetime import datetime
+
+from update_html import (
+    INTERVAL_COL,
+    NUMERIC_COLS,
+    NUMERIC_KEYS,
+    delivery_day_of,
+    is_snapshot,
+    page_state_file,
+    prague_tz,
+    write_atomic,
+)
+
+AGGREGATES_DIR = os.path.join("data", "aggregates")
+
+
+def new_state(delivery_day):
+    return {
+        "delivery_day": delivery_day,
+        "folded": 0,
+        "pending": [],
+        "intervals": 0,
+        "volume": 0.0,
+        "value": 0.0,
+        "buy": 0.0,
+        "sell": 0.0,
+        "open": None,
+        "open_slot": None,
+        "high": None,
+        "low": None,
+        "close": None,
+        "close_slot": None,
+        "close_interval": None,
+    }
+
+
+def state_path(key, state_dir=AGGREGATES_DIR):
+    """
+    The state file of the page at path `key` (e.g. "index.html").
+    """
+    return page_state_file(key, state_dir)
+
+
+def load_state(state_file):
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else None
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(state, state_file):
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    write_atomic(state_file, json.dumps(state, indent=2, sort_keys=True))
+
+
+def metric_values(df, index, key, slots):
+    """
+    The values of one metric for the given slots, without touching the
+    other rows.
+    """
+    import numpy as np
+
+    if is_snapshot(df):
+        return np.asarray(df.column(key), dtype="float64")[slots]
+    col = NUMERIC_COLS[NUMERIC_KEYS.index(key)]
+    return df[col].to_numpy(dtype="float64")[index.positions[slots]]
+
+
+def fold(state, df, index, slots):
+    """
+    Fold the given ended slots (ascending) into the running totals. Slots
+    the workbook has no data for yet go to state["pending"] and are tried
+    again on the next update, so late-published intervals still count.
+    """
+    import numpy as np
+
+    slots = np.asarray(slots, dtype=np.int64)
+    filled = ~index.is_empty[index.positions[slots]]
+    state["pending"] = [int(slot) for slot in slots[~filled]]
+    slots = slots[filled]
+    if not len(slots):
+        return state
+
+    values = {key: metric_values(df, index, key, slots) for key in NUMERIC_KEYS}
+    weighted = ~np.isnan(values["vp"]) & ~np.isnan(values["zm"])
+    state["intervals"] += len(slots)
+    state["volume"] += float(np.nansum(values["zm"][weighted]))
+    state["value"] += float(np.sum(values["vp"][weighted] * values["zm"][weighted]))
+    state["buy"] += float(np.nansum(values["zmn"]))
+    state["sell"] += float(np.nansum(values["zmp"]))
+
+    # Late slots can be earlier than the current open or later than the
+    # current close, so both remember the slot they came from
+    priced = np.flatnonzero(~np.isnan(values["vp"]))
+    if len(priced) and (state.get("open_slot") is None or slots[priced[0]] < state["open_slot"]):
+        state["open"] = float(values["vp"][priced[0]])
+        state["open_slot"] = int(slots[priced[0]])
+    high = values["maxc"][~np.isnan(values["maxc"])]
+    if len(high):
+        state["high"] = float(high.max()) if state["high"] is None else max(state["high"], float(high.max()))
+    low = values["minc"][~np.isnan(values["minc"])]
+    if len(low):
+        state["low"] = float(low.min()) if state["low"] is None else min(state["low"], float(low.min()))
+
+    # Close: last price of the latest interval that has one (VP if no PC)
+    close = np.where(np.isnan(values["pc"]), values["vp"], values["pc"])
+    priced = np.flatnonzero(~np.isnan(close))
+    if len(priced) and (state.get("close_slot") is None or slots[priced[-1]] > state["close_slot"]):
+        slot = int(slots[priced[-1]])
+        state["close"] = float(close[priced[-1]])
+        state["close_slot"] = slot
+        state["close_interval"] = str(df.iloc[int(index.positions[slot])][INTERVAL_COL])
+    return state
+
+
+def update(state, df, index, now=None):
+    """
+    Bring state up to date with every interval of df that has ended by
+    now. Returns the (possibly new) state.
+    """
+    import numpy as np
+
+    now = now or datetime.now(prague_tz())
+    day = delivery_day_of(df) or now.astimezone(prague_tz()).date()
+    if not state or state.get("delivery_day") != day.isoformat() or state.get("folded", 0) > len(index):
+        state = new_state(day.isoformat())
+    else:
+        state = dict(state)
+    if len(index) == 0:
+        return state
+
+    _, ends = index.instants(day)
+    closed = int(np.searchsorted(ends, now.timestamp(), side="right"))
+    slots = state.get("pending", []) + list(range(state["folded"], closed))
+    if slots:
+        state = fold(state, df, index, slots)
+        state["folded"] = max(state["folded"], closed)
+    return state
+
+
+def summary(state):
+    """
+    Figures for the page and the feed (None if nothing has been folded yet).
+    """
+    if not state or not state["intervals"]:
+        return None
+    return {
+        "delivery_day": state["delivery_day"],
+        "intervals": state["intervals"],
+        "vwap": state["value"] / state["volume"] if state["volume"] else None,
+        "volume_mwh": state["volume"],
+        "buy_mwh": state["buy"],
+        "sell_mwh": state["sell"],
+        "open": state["open"],
+        "high": state["high"],
+        "low": state["low"],
+        "close": state["close"],
+        "close_interval": state["close_interval"],
+    }
+
+
+def day_aggregates(df, index, key="index.html", state_dir=AGGREGATES_DIR, now=None):
+    """
+    Load the state of the page `key`, fold in newly ended intervals, save
+    it back if it changed and return the summary.
+    """
+    state_file = state_path(key, state_dir)
+    state = load_state(state_file)
+    updated = update(state, df, index, now)
+    if updated != state:
+        save_state(updated, state_file)
+    return summary(updated)
+
+
+def fmt(value, digits=2):
+    return "NA" if value is None else f"{value:.{digits}f}"
+
+
+def format_html(figures):
+    """
+    One line of day figures to show under the current block.
+    """
+    if not figures:
+        return ""
+    return (
+        f"<p class='aggregates'>Day so far ({figures['intervals']} intervals): "
+        f"VWAP {fmt(figures['vwap'])} | "
+        f"ZM {fmt(figures['volume_mwh'], 1)} MWh "
+        f"(buy {fmt(figures['buy_mwh'], 1)}, sell {fmt(figures['sell_mwh'], 1)}) | "
+        f"O {fmt(figures['open'])} H {fmt(figures['high'])} "
+        f"L {fmt(figures['low'])} C {fmt(figures['close'])}</p>"
+    )
@@ -0,0 +1,200 @@
+"""
+Date-partitioned Parquet archive of the OTE intraday workbooks.
+
+Every fetched day lives in its own file:
+
+    data/archive/delivery_day=2025-02-01/data.parquet
+
+Appending the same workbook twice is a no-op, and a newer workbook for the
+same day only replaces the intervals it actually carries data for.
+
+Rows carry the absolute UTC start/end of their interval, so history can be
+queried by instant (read_range) without caring about 92/100-slot days.
+"""
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+from update_html import NUMERIC_KEYS, IntervalIndex, add_instant_columns, day_slots, interval_table, prague_tz
+
+ARCHIVE_DIR = os.path.join("data", "archive")
+PARTITION_KEY = "delivery_day"
+DATA_FILE = "data.parquet"
+
+ARCHIVE_COLUMNS = (
+    ["slot", "interval", "start_minute", "end_minute", "start_utc", "end_utc"]
+    + NUMERIC_KEYS
+    + ["is_empty", "fetched_at"]
+)
+
+
+def day_path(delivery_day, archive_dir=ARCHIVE_DIR):
+    if isinstance(delivery_day, (date, datetime)):
+        delivery_day = delivery_day.strftime("%Y-%m-%d")
+    return os.path.join(archive_dir, f"{PARTITION_KEY}={delivery_day}", DATA_FILE)
+
+
+def as_date(delivery_day):
+    if isinstance(delivery_day, datetime):
+        return delivery_day.date()
+    if isinstance(delivery_day, date):
+        return delivery_day
+    return date.fromisoformat(delivery_day)
+
+
+def to_archive_frame(df, fetched_at=None, delivery_day=None):
+    """
+    Convert a DataFrame from fetch_and_process_data into the archive layout:
+    one row per parseable interval, keyed by its slot (0-based ordinal within
+    the delivery day), with short typed column names.
+    """
+    frame = interval_table(df, delivery_day=as_date(delivery_day) if delivery_day else None)
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    fetched_at = pd.Timestamp(fetched_at)
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.tz_localize("UTC")
+    frame["fetched_at"] = fetched_at.tz_convert("UTC")
+    return frame[ARCHIVE_COLUMNS]
+
+
+def merge_day(existing, frame):
+    """
+    Merge a new archive frame into the stored one for the same day. Per slot
+    the new row wins, except that an empty new row never replaces data.
+    """
+    if existing is None or existing.empty:
+        return frame.sort_values("slot").reset_index(drop=True)
+
+    combined = pd.concat(
+        [existing.assign(_new=0), frame.assign(_new=1)],
+        ignore_index=True,
+    )
+    combined["_rank"] = (~combined["is_empty"]).astype(int) * 2 + combined["_new"]
+    combined = (
+        combined.sort_values(["slot", "_rank"], kind="stable")
+        .drop_duplicates("slot", keep="last")
+        .drop(columns=["_new", "_rank"])
+        .sort_values("slot")
+        .reset_index(drop=True)
+    )
+    return combined[ARCHIVE_COLUMNS]
+
+
+def archive_day(df, delivery_day=None, archive_dir=ARCHIVE_DIR, fetched_at=None):
+    """
+    Append a fetched DataFrame to the archive partition of its delivery day.
+    delivery_day defaults to df.attrs["delivery_day"].
+
+    Returns the partition path, or None if nothing changed on disk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    delivery_day = delivery_day or df.attrs.get("delivery_day")
+    if not delivery_day:
+        raise ValueError("Unknown delivery day; cannot archive.")
+
+    path = day_path(delivery_day, archive_dir)
+    existing = read_day(delivery_day, archive_dir) if os.path.exists(path) else None
+    if existing is not None:
+        existing = existing[ARCHIVE_COLUMNS]
+
+    merged = merge_day(existing, to_archive_frame(df, fetched_at, delivery_day))
+    if existing is not None and merged.drop(columns="fetched_at").equals(existing.drop(columns="fetched_at")):
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    table = pa.Table.from_pandas(merged, preserve_index=False)
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_day_table(delivery_day, archive_dir=ARCHIVE_DIR, columns=None):
+    """
+    Memory-map one delivery day and return it as a pyarrow Table.
+    """
+    import pyarrow.parquet as pq
+
+    return pq.read_table(day_path(delivery_day, archive_dir), columns=columns, memory_map=True)
+
+
+def is_complete_day(delivery_day, archive_dir=ARCHIVE_DIR):
+    """
+    Whether the partition of delivery_day holds every interval of the day
+    with data, i.e. a later workbook has nothing left to add.
+    """
+    try:
+        table = read_day_table(delivery_day, archive_dir, columns=["is_empty"])
+    except (OSError, ValueError):
+        return False
+    if table.num_rows != day_slots(as_date(delivery_day)):
+        return False
+    return not any(table.column("is_empty").to_pylist())
+
+
+def with_instants(frame, delivery_day):
+    """
+    Add start_utc / end_utc to a partition written before they were
+    archived, derived from its start/end minutes.
+    """
+    if "start_utc" in frame.columns or "start_minute" not in frame.columns:
+        return frame
+    frame = frame.sort_values("slot").reset_index(drop=True)
+    index = IntervalIndex.from_minutes(frame["start_minute"].to_numpy(), frame["end_minute"].to_numpy())
+    return add_instant_columns(frame, index, as_date(delivery_day))
+
+
+def read_day(delivery_day, archive_dir=ARCHIVE_DIR, columns=None):
+    """
+    Read one delivery day from the archive as a DataFrame.
+    """
+    table = read_day_table(delivery_day, archive_dir)
+    if columns is not None and "start_utc" in table.column_names:
+        return table.select(columns).to_pandas()
+    frame = with_instants(table.to_pandas(), delivery_day)
+    return frame if columns is None else frame[columns]
+
+
+def read_range(start, end, archive_dir=ARCHIVE_DIR, columns=None):
+    """
+    Archived intervals starting in [start, end), ordered by start_utc.
+    start and end are aware datetimes (naive ones are taken as UTC); the
+    partitions are chosen by their Prague delivery day, so ranges across
+    DST transition days return every interval exactly once.
+    """
+    start, end = (pd.Timestamp(t) for t in (start, end))
+    start, end = (t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC") for t in (start, end))
+    first = start.tz_convert(prague_tz()).date()
+    last = end.tz_convert(prague_tz()).date()
+
+    frames = []
+    for day in list_days(archive_dir):
+        if first - timedelta(days=1) <= day <= last:
+            frame = read_day(day, archive_dir)
+            frame = frame[(frame["start_utc"] >= start) & (frame["start_utc"] < end)]
+            if not frame.empty:
+                frames.append(frame.assign(delivery_day=day.isoformat()))
+    if not frames:
+        return pd.DataFrame(columns=(columns or ARCHIVE_COLUMNS + ["delivery_day"]))
+    result = pd.concat(frames, ignore_index=True).sort_values("start_utc", kind="stable").reset_index(drop=True)
+    return result if columns is None else result[columns]
+
+
+def list_days(archive_dir=ARCHIVE_DIR):
+    """
+    Return the archived delivery days as sorted date objects.
+    """
+    if not os.path.isdir(archive_dir):
+        return []
+    prefix = PARTITION_KEY + "="
+    days = []
+    for name in os.listdir(archive_dir):
+        if name.startswith(prefix) and os.path.exists(os.path.join(archive_dir, name, DATA_FILE)):
+            try:
+                days.append(date.fromisoformat(name[len(prefix):]))
+            except ValueError:
+                continue
+    return sorted(days)
@@ -0,0 +1,276 @@
+"""
+asyncio variant of the update_html.py pipeline.
+
+    python async_pipeline.py
+    python async_pipeline.py --report intraday=/cs/kratkodobe-trhy/elektrina/vnitrodenni-trh \
+                             --report other=/cs/some/other/report
+
+Every report is handled by its own task: the download of a predicted
+workbook URL runs while the landing page is still being scanned, Excel
+parsing, archiving and rendering are pushed to worker threads, and one
+pooled aiohttp session serves all reports, so a slow report never blocks
+the others.
+"""
+import argparse
+import asyncio
+import codecs
+import hashlib
+import os
+from contextlib import suppress
+from datetime import datetime
+
+from update_html import (
+    BASE_URL,
+    CACHE_FILE,
+    EXCEL_READERS,
+    LANDING_PATH,
+    REQUEST_TIMEOUT,
+    ReportLinkScanner,
+    ReportNotModified,
+    archive_report,
+    conditional_headers,
+    href_day,
+    load_cache,
+    prague_tz,
+    predict_report_href,
+    read_report,
+    render_page,
+    save_cache,
+    start_run_report,
+)
+
+DEFAULT_REPORT = "intraday"
+DEFAULT_REPORTS = {DEFAULT_REPORT: LANDING_PATH}
+
+
+class AsyncFetchClient:
+    """
+    Pooled keep-alive aiohttp session, the async twin of FetchClient.
+    Use as an async context manager.
+    """
+
+    def __init__(self, base_url=BASE_URL, pool_size=8, timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"Accept-Encoding": "gzip, deflate"},
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def url_for(self, path_or_url):
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return self.base_url + path_or_url
+
+
+async def scan_report_href(client, landing_path=LANDING_PATH, chunk_size=16384):
+    """
+    Stream the landing page and return the absolute report URL as soon as
+    the first link in p.report_attachment_links has been seen.
+    """
+    scanner = ReportLinkScanner()
+    async with client.session.get(client.url_for(landing_path)) as response:
+        response.raise_for_status()
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        async for chunk in response.content.iter_chunked(chunk_size):
+            scanner.feed(decoder.decode(chunk))
+            if scanner.href is not None:
+                break
+
+    if not scanner.found_container:
+        raise ValueError("Failed to find the report attachment container.")
+    if scanner.href is None:
+        raise ValueError("Failed to find the download link.")
+    return client.url_for(scanner.href)
+
+
+async def download(client, url, headers=None):
+    """
+    GET url and return (status, headers, body); body is empty on 304.
+    """
+    async with client.session.get(url, headers=headers or {}) as response:
+        if response.status == 304:
+            return response.status, response.headers.copy(), b""
+        response.raise_for_status()
+        chunks = []
+        async for chunk in response.content.iter_chunked(65536):
+            chunks.append(chunk)
+        return response.status, response.headers.copy(), b"".join(chunks)
+
+
+def cache_keys(name):
+    """
+    Cache entries for a report. The default report shares its entries with
+    update_html.py, other reports get their own namespace.
+    """
+    if name == DEFAULT_REPORT:
+        return "report", "report_link"
+    return f"{name}.report", f"{name}.report_link"
+
+
+async def _cancel(task):
+    if task is None:
+        return
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
+
+
+async def fetch_report(client, name, landing_path, cache, backend=None):
+    """
+    Fetch and parse one report, updating its entries in the in-memory cache.
+    Raises ReportNotModified like fetch_and_process_data.
+
+    When the predicted URL is for a new day (and so might 404), the landing
+    page is scanned concurrently instead of only after the miss.
+    """
+    import aiohttp
+
+    report_key, link_key = cache_keys(name)
+    cached = cache.get(report_key)
+    cached_link = cache.get(link_key)
+    today = datetime.now(prague_tz()).date()
+
+    predicted = predict_report_href(cached_link, today, client.base_url)
+    speculative = predicted is None or predicted != cached_link.get("href")
+    scan_task = asyncio.create_task(scan_report_href(client, landing_path)) if speculative else None
+
+    result = None
+    file_link = None
+    try:
+        if predicted:
+            file_link = client.url_for(predicted)
+            try:
+                result = await download(client, file_link, conditional_headers(cached, file_link))
+            except aiohttp.ClientResponseError as e:
+                if e.status != 404:
+                    raise
+                print(f"[{name}] Predicted report URL {file_link} not found; using the landing page.")
+
+        if result is None:
+            if scan_task is None:
+                scan_task = asyncio.create_task(scan_report_href(client, landing_path))
+            file_link = await scan_task
+            scan_task = None
+            result = await download(client, file_link, conditional_headers(cached, file_link))
+    finally:
+        await _cancel(scan_task)
+
+    status, headers, body = result
+    if status == 304:
+        raise ReportNotModified(f"Server returned 304 for {file_link}.")
+    content_hash = hashlib.sha256(body).hexdigest()
+    if cached and cached.get("sha256") == content_hash:
+        raise ReportNotModified("Downloaded workbook is identical to the last one.")
+
+    df = await asyncio.to_thread(read_report, body, backend)
+    link_day = href_day(file_link) or today
+    df.attrs["delivery_day"] = link_day.isoformat()
+    df.attrs["source_url"] = file_link
+    df.attrs["sha256"] = content_hash
+
+    cache[report_key] = {
+        "url": file_link,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "sha256": content_hash,
+    }
+    cache[link_key] = {"href": file_link, "day": link_day.isoformat()}
+    return df
+
+
+def output_file_for(name, output_dir="."):
+    """
+    The default report renders to index.html; every other report gets its
+    own sub-directory so its page and feed files don't collide.
+    """
+    if name == DEFAULT_REPORT:
+        return os.path.join(output_dir, "index.html")
+    report_dir = os.path.join(output_dir, name)
+    os.makedirs(report_dir, exist_ok=True)
+    return os.path.join(report_dir, "index.html")
+
+
+async def process_report(client, name, landing_path, cache, args):
+    """
+    Fetch, archive and render one report. Returns a short status string.
+    """
+    # Every report runs in its own task, so its stage timings and notes go
+    # to a RunReport of its own
+    start_run_report().note("report", name)
+    try:
+        df = await fetch_report(client, name, landing_path, cache, args.excel_backend)
+    except ReportNotModified as e:
+        print(f"[{name}] Report unchanged since last run: {e}")
+        return "unchanged"
+    except Exception as e:
+        print(f"[{name}] Error while fetching/processing data: {e}")
+        return "failed"
+
+    archive_dir = args.archive_dir if name == DEFAULT_REPORT else os.path.join(args.archive_dir, name)
+    if not args.no_archive:
+        await asyncio.to_thread(archive_report, df, archive_dir)
+    await asyncio.to_thread(render_page, df, output_file_for(name, args.output_dir), archive_dir=archive_dir)
+    return "updated"
+
+
+async def run_pipeline(reports, args):
+    """
+    Run every report concurrently over one pooled session, then persist the
+    validator cache once. Returns {report name: status}.
+    """
+    cache = load_cache(args.cache_file)
+    async with AsyncFetchClient(base_url=args.base_url, pool_size=args.pool_size) as client:
+        statuses = await asyncio.gather(*(
+            process_report(client, name, path, cache, args) for name, path in reports.items()
+        ))
+    save_cache(cache, args.cache_file)
+    return dict(zip(reports, statuses))
+
+
+def parse_report(value):
+    name, sep, path = value.partition("=")
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError("expected NAME=LANDING_PATH")
+    return name, path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch one or more OTE reports concurrently with asyncio.")
+    parser.add_argument(
+        "--report",
+        type=parse_report,
+        action="append",
+        help=f"Report to fetch as NAME=LANDING_PATH; may be repeated (default: {DEFAULT_REPORT}).",
+    )
+    parser.add_argument("--base-url", default=BASE_URL, help="OTE website base URL (default: $OTE_BASE_URL or the live site).")
+    parser.add_argument("--pool-size", type=int, default=8, help="Maximum open connections (default: 8).")
+    parser.add_argument("--output-dir", default=".", help="Where to write the HTML pages and feeds.")
+    parser.add_argument("--cache-file", default=CACHE_FILE, help="Validator cache file.")
+    parser.add_argument("--excel-backend", choices=["auto"] + sorted(EXCEL_READERS), default=None)
+    parser.add_argument("--archive-dir", default=os.path.join("data", "archive"))
+    parser.add_argument("--no-archive", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    reports = dict(args.report) if args.report else dict(DEFAULT_REPORTS)
+    statuses = asyncio.run(run_pipeline(reports, args))
+    for name, status in statuses.items():
+        print(f"{name}: {status}")
+
+
+if __name__ == "__main__":
+    main()
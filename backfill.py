@@ -0,0 +1,205 @@
+"""
+Backfill historical OTE intraday workbooks into the Parquet archive.
+
+    python backfill.py 2025-01-01 2025-01-31
+
+Downloads run on a thread pool sharing one pooled FetchClient, throttled
+by a rate limiter; parsing and archiving run on a process pool. Days that
+are already archived with every interval filled are skipped, so an
+interrupted backfill picks up where it stopped when re-run.
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from update_html import (
+    BASE_URL,
+    CACHE_FILE,
+    EXCEL_READERS,
+    FetchClient,
+    href_day,
+    load_cache,
+    prague_tz,
+    predict_report_href,
+    read_report,
+    scrape_report_href,
+)
+
+
+class RateLimiter:
+    """
+    Spaces calls to wait() at least 1/rate seconds apart across threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def reference_link(client, cache_file=CACHE_FILE):
+    """
+    A known report link to derive historical URLs from: the one cached by
+    update_html.py if it was recorded against the same site, or else the
+    current one from the landing page.
+    """
+    link = load_cache(cache_file).get("report_link")
+    if link and link.get("href", "").startswith(client.base_url + "/"):
+        return link
+    href = client.url_for(scrape_report_href(client))
+    day = href_day(href) or datetime.now(prague_tz()).date()
+    return {"href": href, "day": day.isoformat()}
+
+
+def download_day(client, limiter, link, day):
+    """
+    Download the workbook for one delivery day. Returns (day, content),
+    with content None if OTE has no report for that day.
+    """
+    import requests
+
+    href = predict_report_href(link, day, client.base_url)
+    if href is None:
+        raise ValueError(f"Cannot derive the report URL for {day} from {link.get('href')}.")
+
+    limiter.wait()
+    try:
+        response = client.get(href)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return day, None
+        raise
+    return day, response.content
+
+
+def parse_and_archive(day_iso, content, archive_dir, backend=None):
+    """
+    Process-pool worker: parse one workbook and write its archive partition.
+    Returns (day_iso, number of non-empty intervals).
+    """
+    import archive
+
+    df = read_report(content, backend)
+    archive.archive_day(df, delivery_day=day_iso, archive_dir=archive_dir)
+    return day_iso, int((~df["is_empty"]).sum())
+
+
+def backfill(start, end, archive_dir, workers=4, processes=None, rate=2.0,
+             backend=None, force=False, cache_file=CACHE_FILE, base_url=BASE_URL):
+    """
+    Fetch and archive every delivery day from start to end (inclusive).
+    Returns a dict with the days that were archived, missing and failed.
+    """
+    import archive
+
+    today = datetime.now(prague_tz()).date()
+    # Only days archived with every interval filled are done; a partition
+    # written from a partial workbook (e.g. today's, archived by
+    # update_html.py) is fetched again and merged. Today's report is still
+    # growing, so it is never considered done
+    done = set() if force else {
+        day for day in archive.list_days(archive_dir)
+        if start <= day <= end and day != today and archive.is_complete_day(day, archive_dir)
+    }
+    days = [d for d in date_range(start, end) if d not in done]
+    skipped = len(list(date_range(start, end))) - len(days)
+    print(f"Backfilling {len(days)} day(s) from {start} to {end}; {skipped} already archived.")
+
+    result = {"archived": [], "missing": [], "failed": []}
+    if not days:
+        return result
+
+    client = FetchClient(base_url=base_url, pool_size=workers)
+    limiter = RateLimiter(rate)
+    link = reference_link(client, cache_file)
+
+    with ThreadPoolExecutor(max_workers=workers) as downloads, \
+            ProcessPoolExecutor(max_workers=processes) as parsers:
+        download_futures = {
+            downloads.submit(download_day, client, limiter, link, day): day for day in days
+        }
+        parse_futures = {}
+        for future in as_completed(download_futures):
+            day = download_futures[future]
+            try:
+                _, content = future.result()
+            except Exception as e:
+                print(f"{day}: download failed: {e}")
+                result["failed"].append(day)
+                continue
+            if content is None:
+                print(f"{day}: no report published.")
+                result["missing"].append(day)
+                continue
+            parse_futures[parsers.submit(parse_and_archive, day.isoformat(), content, archive_dir, backend)] = day
+
+        for future in as_completed(parse_futures):
+            day = parse_futures[future]
+            try:
+                _, filled = future.result()
+            except Exception as e:
+                print(f"{day}: parse/archive failed: {e}")
+                result["failed"].append(day)
+                continue
+            print(f"{day}: archived {filled} non-empty interval(s).")
+            result["archived"].append(day)
+
+    client.close()
+    for key in result:
+        result[key].sort()
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill historical OTE intraday reports into the archive.")
+    parser.add_argument("start", type=date.fromisoformat, help="First delivery day (YYYY-MM-DD).")
+    parser.add_argument("end", type=date.fromisoformat, help="Last delivery day (YYYY-MM-DD), inclusive.")
+    parser.add_argument("--archive-dir", default="data/archive", help="Directory of the Parquet archive.")
+    parser.add_argument("--base-url", default=BASE_URL, help="OTE website base URL (default: $OTE_BASE_URL or the live site).")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent downloads / pooled connections (default: 4).")
+    parser.add_argument("--processes", type=int, default=None, help="Parser processes (default: CPU count).")
+    parser.add_argument("--rate", type=float, default=2.0, help="Maximum requests per second (default: 2).")
+    parser.add_argument("--excel-backend", choices=["auto"] + sorted(EXCEL_READERS), default=None)
+    parser.add_argument("--force", action="store_true", help="Re-fetch days that are already archived.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.end < args.start:
+        print("End date is before start date.")
+        sys.exit(2)
+
+    started = time.perf_counter()
+    result = backfill(
+        args.start, args.end, args.archive_dir,
+        workers=args.workers, processes=args.processes, rate=args.rate,
+        backend=args.excel_backend, force=args.force, base_url=args.base_url,
+    )
+    print(f"Done in {time.perf_counter() - started:.1f}s: "
+          f"{len(result['archived'])} archived, {len(result['missing'])} missing, "
+          f"{len(result['failed'])} failed.")
+    if result["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Benchmarks for the update_html.py pipeline on synthetic OTE workbooks.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --repeat 10 --output before.json
+    python benchmarks/bench_pipeline.py --output after.json --compare before.json
+
+Each case is a generated workbook (see synthetic_workbooks.py). For every
+case the parse step of fetch_and_process_data (served from a local file,
+no network), both Excel readers, get_current_time_block, get_fallback_row,
+generate_html and the day chart are timed separately. Results are written
+as JSON with sorted keys and rounded timings, so two runs can be diffed or
+compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chart  # noqa: E402
+import update_html  # noqa: E402
+from synthetic_workbooks import landing_page, make_workbook, report_href  # noqa: E402
+from update_html import (  # noqa: E402
+    EXCEL_READERS,
+    FetchClient,
+    LANDING_PATH,
+    build_interval_index,
+    delivery_day_of,
+    fetch_and_process_data,
+    generate_html,
+    get_current_time_block,
+    get_fallback_row,
+    prague_tz,
+    read_report,
+)
+
+CASES = {
+    "day_96": dict(slots=96),
+    "day_96_half_filled": dict(slots=96, filled=48),
+    # DST transition days, served under their real date so the times in
+    # SELECTION_TIMES fall on the intervals they name
+    "dst_100": dict(slots=100, day=date(2025, 10, 26)),
+    "dst_92": dict(slots=92, day=date(2025, 3, 30)),
+    "days_30": dict(slots=96, days=30),
+    "repeated_headers": dict(slots=96, repeated_header_every=4),
+    "empty_rows": dict(slots=96, filled=60, empty_row_every=3),
+}
+
+# Fixed "now" values for selection, spread over the day, so runs compare
+SELECTION_TIMES = ["00:07", "02:30", "06:00", "11:52", "14:15", "19:44", "23:59"]
+
+BENCH_BASE_URL = "http://ote.bench"
+
+
+class LocalFileAdapter:
+    """
+    requests transport adapter that answers every URL from files under
+    root, keyed by the URL path. Mounted on BENCH_BASE_URL it lets
+    fetch_and_process_data run unchanged without touching the network.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def send(self, request, **kwargs):
+        import requests
+
+        path = os.path.join(self.root, urlparse(request.url).path.lstrip("/"))
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            response.status_code = 200
+        else:
+            data = b""
+            response.status_code = 404
+        response.headers["Content-Length"] = str(len(data))
+        response.raw = io.BytesIO(data)
+        response._content = data
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
+
+
+def local_client(root):
+    client = FetchClient(base_url=BENCH_BASE_URL)
+    client.session.mount(BENCH_BASE_URL, LocalFileAdapter(root))
+    return client
+
+
+def write_site(root, content, day):
+    """
+    Lay out a landing page and the workbook under root as OTE serves them.
+    """
+    href = report_href(day)
+    for path, data in ((LANDING_PATH, landing_page(href).encode("utf-8")), (href, content)):
+        full = os.path.join(root, path.lstrip("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(data)
+
+
+def timeit(fn, repeat, number=1):
+    """
+    Call fn number times per sample, repeat samples; return per-call
+    timings in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def selection_times(day):
+    tz = prague_tz()
+    return [tz.localize(datetime.combine(day, datetime.strptime(t, "%H:%M").time()))
+            for t in SELECTION_TIMES]
+
+
+def bench_case(name, params, repeat, workdir):
+    """
+    Run every benchmark for one case and return {benchmark: timings}.
+    The workbook is for params["day"], today if not given.
+    """
+    day = params.get("day") or datetime.now(prague_tz()).date()
+    content = make_workbook(**dict(params, day=day))
+    site = os.path.join(workdir, name)
+    write_site(site, content, day)
+    client = local_client(site)
+
+    results = {"_workbook": {"bytes": len(content), "params": dict(params, day=day.isoformat())}}
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        for backend in sorted(EXCEL_READERS):
+            results[f"read_report[{backend}]"] = timeit(lambda: read_report(content, backend), repeat)
+        results["fetch_and_process_data"] = timeit(
+            lambda: fetch_and_process_data(client=client, use_cache=False), repeat
+        )
+        df = fetch_and_process_data(client=client, use_cache=False)
+    results["_workbook"]["rows"] = len(df)
+
+    nows = selection_times(day)
+    index = build_interval_index(df)
+    number = 20
+    results["build_interval_index"] = timeit(lambda: build_interval_index(df), repeat, number)
+    results["get_current_time_block"] = timeit(
+        lambda: [get_current_time_block(df, now) for now in nows], repeat, number
+    )
+    results["get_current_time_block[indexed]"] = timeit(
+        lambda: [get_current_time_block(df, now, index) for now in nows], repeat, number
+    )
+
+    positions = list(range(0, len(df), max(len(df) // 16, 1)))
+    results["get_fallback_row"] = timeit(
+        lambda: [get_fallback_row(df, pos) for pos in positions], repeat, number
+    )
+    results["get_fallback_row[indexed]"] = timeit(
+        lambda: [get_fallback_row(df, pos, index) for pos in positions], repeat, number
+    )
+
+    row, msg = get_current_time_block(df, nows[3], index)
+    _, current = index.lookup(nows[3], delivery_day_of(df))
+    results["day_chart"] = timeit(lambda: chart.day_chart(df, index, current), repeat, number)
+    output_file = os.path.join(workdir, f"{name}.html")
+    with quiet:
+        results["generate_html"] = timeit(
+            lambda: generate_html(row, msg, output_file, force=True), repeat, number
+        )
+        results["generate_html[unchanged]"] = timeit(
+            lambda: generate_html(row, msg, output_file), repeat, number
+        )
+    client.close()
+    return results
+
+
+def environment():
+    import numpy
+    import openpyxl
+    import pandas
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "openpyxl": openpyxl.__version__,
+    }
+
+
+def compare(current, baseline):
+    """
+    Print the median change of every benchmark present in both runs.
+    """
+    print(f"{'case':<22} {'benchmark':<34} {'before':>10} {'after':>10} {'change':>8}")
+    for case, benches in sorted(current["results"].items()):
+        old_benches = baseline.get("results", {}).get(case, {})
+        for bench, timing in sorted(benches.items()):
+            if bench.startswith("_") or bench not in old_benches:
+                continue
+            before = old_benches[bench]["median_ms"]
+            after = timing["median_ms"]
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"{case:<22} {bench:<34} {before:>10.3f} {after:>10.3f} {change:>+7.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the update_html pipeline on synthetic workbooks.")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark (default: 5).")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="Only run this case; may be repeated (default: all).")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = args.case or list(CASES)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in cases:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = bench_case(name, CASES[name], args.repeat, workdir)
+
+    run = {"environment": environment(), "results": results}
+    text = json.dumps(run, indent=2, sort_keys=True) + "\n"
+    if args.output:
+        update_html.write_atomic(args.output, text)
+        print(f"Results written to {args.output}.", file=sys.stderr)
+    else:
+        sys.stdout.write(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(run, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Local stand-in for the OTE website, for offline end-to-end and load tests.
+
+    python benchmarks/fake_ote_server.py --port 8000 --latency 200 --error-rate 0.1
+    OTE_BASE_URL=http://127.0.0.1:8000 python update_html.py
+
+Serves the intraday landing page with the report_attachment_links markup
+and a workbook for every delivery day up to today at the URLs OTE uses.
+Workbooks are synthetic (today's fills up to the current quarter hour) or
+a recorded file given with --workbook. Latency, 5xx errors and stale data
+can be injected; ETag / Last-Modified validators and conditional requests
+are supported. GET /_stats returns request counts as JSON.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_workbooks import landing_page, make_workbook, report_href  # noqa: E402
+from update_html import LANDING_PATH, day_slots, href_day, local_midnight, prague_tz  # noqa: E402
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class FakeOTE:
+    """
+    Request handling and fault injection, independent of the HTTP server
+    so it can also be driven directly from a script.
+    """
+
+    def __init__(self, workbook=None, slots=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, stale_rate=0.0, stale_requests=0, etag=True, seed=None):
+        self.workbook = workbook
+        self.slots = slots
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stale_rate = stale_rate
+        self.stale_requests = stale_requests
+        self.etag = etag
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.workbooks = {}
+        self.quarter = None
+        self.quarter_requests = 0
+
+    def now(self):
+        return datetime.now(prague_tz())
+
+    def slots_for(self, day):
+        """
+        Intervals in a synthetic day: --slots if given, else 92/96/100
+        following the Prague DST rules for that day.
+        """
+        return self.slots or day_slots(day)
+
+    def current_slot(self, now):
+        return int((now - local_midnight(now.date())).total_seconds()) // 900
+
+    def filled_intervals(self, day, now):
+        """
+        How many intervals of `day` carry trades: all of them for past days,
+        up to and including the current quarter hour for today.
+        """
+        if day < now.date():
+            return None
+        return min(self.current_slot(now) + 1, self.slots_for(day))
+
+    def workbook_for(self, day, filled):
+        """
+        The workbook bytes and their modification time, generated once per
+        (day, filled) and reused, so validators stay stable between requests.
+        """
+        key = (day, filled)
+        with self.lock:
+            if key not in self.workbooks:
+                if self.workbook is not None:
+                    content = self.workbook
+                else:
+                    content = make_workbook(day=day, slots=self.slots_for(day), filled=filled, seed=day.toordinal())
+                self.workbooks[key] = (content, datetime.now(timezone.utc))
+            return self.workbooks[key]
+
+    def is_stale(self, now):
+        """
+        Whether this request for today's workbook should get the previous
+        quarter's data: always for the first stale_requests requests after
+        each quarter-hour boundary, otherwise with probability stale_rate.
+        """
+        quarter = (now.date(), self.current_slot(now))
+        with self.lock:
+            if quarter != self.quarter:
+                self.quarter = quarter
+                self.quarter_requests = 0
+            self.quarter_requests += 1
+            if self.quarter_requests <= self.stale_requests:
+                return True
+            return self.rng.random() < self.stale_rate
+
+    def handle(self, path, headers):
+        """
+        Answer one GET. Returns (status, headers dict, body bytes).
+        """
+        with self.lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            fail = self.rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+
+        path = path.split("?", 1)[0]
+        if path == "/_stats":
+            with self.lock:
+                body = json.dumps(dict(self.stats), sort_keys=True).encode("utf-8")
+            return 200, {"Content-Type": "application/json"}, body
+
+        if fail:
+            return self.error_status, {"Content-Type": "text/plain"}, b"Injected server error\n"
+
+        now = self.now()
+        if path.rstrip("/") == LANDING_PATH:
+            body = landing_page(report_href(now.date())).encode("utf-8")
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, body
+
+        day = href_day(path) if path.startswith("/pubweb/") else None
+        if day is None or day > now.date():
+            return 404, {"Content-Type": "text/plain"}, b"Not found\n"
+
+        filled = self.filled_intervals(day, now)
+        if filled is not None and self.workbook is None and filled > 1 and self.is_stale(now):
+            filled -= 1
+        content, modified = self.workbook_for(day, filled)
+
+        response_headers = {"Content-Type": XLSX_TYPE}
+        if self.etag:
+            etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+            last_modified = format_datetime(modified, usegmt=True)
+            response_headers["ETag"] = etag
+            response_headers["Last-Modified"] = last_modified
+            if etag in [t.strip() for t in headers.get("If-None-Match", "").split(",")]:
+                return 304, response_headers, b""
+            if not headers.get("If-None-Match") and headers.get("If-Modified-Since") == last_modified:
+                return 304, response_headers, b""
+        return 200, response_headers, content
+
+
+class FakeOTEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        ote = self.server.ote
+        status, headers, body = ote.handle(self.path, self.headers)
+        with ote.lock:
+            ote.stats["requests"] += 1
+            ote.stats[f"status_{status}"] += 1
+            ote.stats["bytes_sent"] += len(body)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(ote, host="127.0.0.1", port=0, verbose=False):
+    """
+    Serve ote on a background thread. Returns (server, base_url); call
+    server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), FakeOTEHandler)
+    server.daemon_threads = True
+    server.ote = ote
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OTE intraday report.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (0 picks a free one).")
+    parser.add_argument("--workbook", help="Serve this recorded workbook for every day instead of synthetic ones.")
+    parser.add_argument("--slots", type=int, choices=[92, 96, 100], default=None,
+                        help="Intervals per synthetic day (default: from the DST rules for the day).")
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request in ms.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency of up to this many ms.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error.")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected errors (default: 503).")
+    parser.add_argument("--stale-rate", type=float, default=0.0,
+                        help="Fraction of requests for today's workbook that get the previous quarter's data.")
+    parser.add_argument("--stale-requests", type=int, default=0,
+                        help="Serve the previous quarter's data to the first N requests after each quarter hour.")
+    parser.add_argument("--no-etag", action="store_true", help="Send no validators and ignore conditional requests.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency/error/stale injection.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workbook = None
+    if args.workbook:
+        with open(args.workbook, "rb") as f:
+            workbook = f.read()
+
+    ote = FakeOTE(
+        workbook=workbook, slots=args.slots, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, error_status=args.error_status, stale_rate=args.stale_rate,
+        stale_requests=args.stale_requests, etag=not args.no_etag, seed=args.seed,
+    )
+    server, base_url = start_server(ote, args.host, args.port, args.verbose)
+    print(f"Fake OTE server on {base_url} (landing page {base_url}{LANDING_PATH})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps(dict(ote.stats), sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Synthetic workbooks in the layout of the OTE intraday report.
+
+Five preamble rows, the header row (with the same embedded newlines OTE
+uses), then one row per quarter-hour interval. Options cover DST days,
+several days concatenated in one sheet, repeated header lines and blank
+rows, so the parsers and selectors can be exercised without the live site.
+"""
+import random
+from datetime import date, timedelta
+from io import BytesIO
+
+HEADER = [
+    "Perioda",
+    "Časový interval",
+    "Zobchodované množství\n(MWh)",
+    "Zobchodované množství - nákup\n(MWh)",
+    "Zobchodované množství - prodej\n(MWh)",
+    "Vážený průměr cen (EUR/MWh)",
+    "Minimální cena\n(EUR/MWh)",
+    "Maximální cena\n(EUR/MWh)",
+    "Poslední cena\n(EUR/MWh)",
+]
+
+
+def interval_labels(slots=96):
+    """
+    Labels for a day with 92 (spring DST), 96 or 100 (autumn DST) slots.
+    On a 100-slot day the 02:00-03:00 hour appears twice; on a 92-slot day
+    it is missing.
+    """
+    if slots not in (92, 96, 100):
+        raise ValueError("slots must be 92, 96 or 100")
+    minutes = [m for m in range(0, 24 * 60, 15)]
+    if slots == 92:
+        minutes = [m for m in minutes if not 120 <= m < 180]
+    elif slots == 100:
+        dst_hour = [m for m in minutes if 120 <= m < 180]
+        cut = minutes.index(180)
+        minutes = minutes[:cut] + dst_hour + minutes[cut:]
+
+    labels = []
+    for start in minutes:
+        end = (start + 15) % (24 * 60)
+        labels.append(f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}")
+    return labels
+
+
+def day_rows(slots=96, filled=None, rng=None):
+    """
+    Rows for one delivery day: the first `filled` intervals carry trades,
+    the rest only their period and label, like a report published mid-day.
+    """
+    rng = rng or random.Random(0)
+    labels = interval_labels(slots)
+    filled = len(labels) if filled is None else filled
+    price = rng.uniform(60, 120)
+
+    rows = []
+    for i, label in enumerate(labels):
+        if i >= filled:
+            rows.append([i + 1, label])
+            continue
+        price = max(-50.0, price + rng.gauss(0, 6))
+        buy = round(rng.uniform(5, 120), 1)
+        sell = round(rng.uniform(5, 120), 1)
+        low = round(price - rng.uniform(0, 25), 2)
+        high = round(price + rng.uniform(0, 25), 2)
+        rows.append([
+            i + 1, label, round(buy + sell, 1), buy, sell,
+            round(price, 2), low, high, round(rng.uniform(low, high), 2),
+        ])
+    return rows
+
+
+def make_workbook(day=None, slots=96, filled=None, days=1, repeated_header_every=0,
+                  empty_row_every=0, seed=0):
+    """
+    Build an .xlsx workbook and return its bytes.
+
+    days > 1 concatenates consecutive delivery days in one sheet, separated
+    by a repeated header line. repeated_header_every / empty_row_every
+    insert a repeated header line / a fully blank row after every N data
+    rows.
+    """
+    import openpyxl
+
+    rng = random.Random(seed)
+    day = day or date(2025, 2, 1)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Vnitrodenní trh"
+    ws.append(["Výsledky vnitrodenního trhu s elektřinou"])
+    ws.append([f"Den dodávky: {day.strftime('%d.%m.%Y')}"])
+    ws.append([])
+    ws.append(["Zdroj: synthetic benchmark data"])
+    ws.append([])
+    ws.append(HEADER)
+
+    for d in range(days):
+        if d > 0:
+            ws.append(HEADER)
+        for n, row in enumerate(day_rows(slots, filled, rng), start=1):
+            ws.append(row)
+            if repeated_header_every and n % repeated_header_every == 0:
+                ws.append(HEADER)
+            if empty_row_every and n % empty_row_every == 0:
+                ws.append([])
+
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def report_filename(day):
+    """
+    Attachment name in the style OTE uses, e.g. IM_15MIN_01_02_2025_CZ.xlsx.
+    """
+    return f"IM_15MIN_{day.strftime('%d_%m_%Y')}_CZ.xlsx"
+
+
+def report_href(day):
+    """
+    Attachment path in the style OTE uses for a delivery day.
+    """
+    return f"/pubweb/attachments/27/{day.strftime('%Y')}/month{day.strftime('%m')}/day{day.strftime('%d')}/{report_filename(day)}"
+
+
+def landing_page(href, filler_blocks=200):
+    """
+    A landing page with the report_attachment_links markup after some
+    unrelated content, so scanners have something to skip.
+    """
+    filler = "\n".join(f"<div class='news'><p>Item {i}</p></div>" for i in range(filler_blocks))
+    return (
+        "<!DOCTYPE html><html lang='cs'><head><meta charset='utf-8'><title>Vnitrodenní trh</title></head>"
+        f"<body>{filler}<p class=\"report_attachment_links\"><a href=\"{href}\">Výsledky (XLSX)</a></p>"
+        "</body></html>"
+    )
+
+
+def date_range(start, days):
+    return [start + timedelta(days=i) for i in range(days)]
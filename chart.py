@@ -0,0 +1,208 @@
+"""
+Inline SVG chart of the delivery day for index.html.
+
+The upper panel draws the weighted price (VP) as a line over the
+MinC-MaxC band; the lower one buy (ZMN) volume as bars above and sell
+(ZMP) volume as bars below a common baseline. The current interval is
+highlighted. Coordinates are computed with numpy from the metric arrays
+and rounded to 0.1 px; when there are more intervals than pixel columns,
+the price series are decimated to the first, lowest, highest and last
+point of each column, so the path stays about as long as the chart is
+wide. Each series is one <path>, there is no JavaScript, and a day renders
+in well under a millisecond.
+"""
+import html
+
+import numpy as np
+
+from update_html import INTERVAL_COL, NUMERIC_COLS, NUMERIC_KEYS, is_snapshot
+
+WIDTH = 720
+HEIGHT = 250
+MARGIN_LEFT = 48
+MARGIN_RIGHT = 8
+PRICE_TOP = 8
+PRICE_HEIGHT = 150
+VOLUME_TOP = PRICE_TOP + PRICE_HEIGHT + 12
+VOLUME_HEIGHT = 56
+LABEL_Y = HEIGHT - 4
+
+COLORS = {
+    "vp": "#1f77b4",
+    "band": "#1f77b4",
+    "buy": "#2ca02c",
+    "sell": "#d62728",
+    "current": "#ff9800",
+    "axis": "#999",
+}
+
+
+def metric_arrays(df, index):
+    """
+    The parsed intervals of df as float arrays keyed by NUMERIC_KEYS, plus
+    the interval labels.
+    """
+    if is_snapshot(df):
+        arrays = {key: np.asarray(df.column(key), dtype="float64") for key in NUMERIC_KEYS}
+        labels = np.char.decode(df.labels, "utf-8").astype(object)
+        return arrays, labels
+    pos = index.positions
+    arrays = {key: df[col].to_numpy(dtype="float64")[pos] for col, key in zip(NUMERIC_COLS, NUMERIC_KEYS)}
+    return arrays, df[INTERVAL_COL].to_numpy(dtype=object)[pos].astype(str)
+
+
+def decimate(xs, ys, width):
+    """
+    Indices of the points to draw: all of them if there are at most
+    `width` points, else the first, lowest, highest and last point of each
+    pixel column (NaNs kept only where a column has nothing else).
+    """
+    n = len(xs)
+    if n <= width:
+        return np.arange(n)
+    columns = np.floor(xs).astype(np.int64)
+    firsts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    lasts = np.r_[firsts[1:], n] - 1
+    lowest = np.lexsort((ys, columns))
+    highest = np.lexsort((-ys, columns))
+    starts = np.searchsorted(columns[lowest], columns[firsts])
+    return np.unique(np.concatenate([firsts, lasts, lowest[starts], highest[starts]]))
+
+
+def scale(values, lo, hi, top, height):
+    """
+    y coordinates for values in [lo, hi], top of the panel at `top`.
+    """
+    return top + height - (values - lo) / (hi - lo) * height
+
+
+def runs(valid):
+    """
+    (start, stop) of each run of True in valid.
+    """
+    edges = np.diff(np.r_[0, valid.astype(np.int8), 0])
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+
+def line_path(xs, ys):
+    """
+    Path data for a line that breaks at NaN values.
+    """
+    parts = []
+    for start, stop in runs(~np.isnan(ys)):
+        points = [f"{x:.1f},{y:.1f}" for x, y in zip(xs[start:stop], ys[start:stop])]
+        parts.append("M" + "L".join(points))
+    return "".join(parts)
+
+
+def band_path(xs, lows, highs):
+    """
+    Path data for a filled band between two series, one closed shape per
+    run of intervals where both are known.
+    """
+    parts = []
+    for start, stop in runs(~np.isnan(lows) & ~np.isnan(highs)):
+        upper = [f"{x:.1f},{y:.1f}" for x, y in zip(xs[start:stop], highs[start:stop])]
+        lower = [f"{x:.1f},{y:.1f}" for x, y in zip(xs[start:stop][::-1], lows[start:stop][::-1])]
+        parts.append("M" + "L".join(upper + lower) + "Z")
+    return "".join(parts)
+
+
+def bars_path(xs, tops, bottoms, bar_width):
+    """
+    Path data for vertical bars centred on xs, from tops to bottoms.
+    """
+    half = bar_width / 2
+    return "".join(
+        f"M{x - half:.1f},{top:.1f}h{bar_width:.1f}V{bottom:.1f}h{-bar_width:.1f}Z"
+        for x, top, bottom in zip(xs, tops, bottoms)
+        if bottom - top >= 0.05
+    )
+
+
+def price_range(arrays):
+    values = np.concatenate([arrays["vp"], arrays["minc"], arrays["maxc"]])
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    lo, hi = float(values.min()), float(values.max())
+    if hi - lo < 1e-9:
+        lo, hi = lo - 1, hi + 1
+    pad = (hi - lo) * 0.05
+    return lo - pad, hi + pad
+
+
+def day_chart(df, index, current=None, width=WIDTH):
+    """
+    The SVG markup for df (a DataFrame with its IntervalIndex, or a
+    DaySnapshot), highlighting the row at position `current`, as returned
+    by IntervalIndex.lookup. Positions rather than labels, because the
+    repeated hour of a 100-slot day has every label twice. Returns ""
+    when there is nothing to draw.
+    """
+    arrays, labels = metric_arrays(df, index)
+    n = len(labels)
+    prices = price_range(arrays) if n else None
+    if prices is None:
+        return ""
+
+    plot_width = width - MARGIN_LEFT - MARGIN_RIGHT
+    step = plot_width / n
+    xs = MARGIN_LEFT + (np.arange(n) + 0.5) * step
+    lo, hi = prices
+
+    keep = decimate(xs - MARGIN_LEFT, arrays["vp"], plot_width)
+    vp = scale(arrays["vp"][keep], lo, hi, PRICE_TOP, PRICE_HEIGHT)
+    band_keep = decimate(xs - MARGIN_LEFT, arrays["maxc"], plot_width)
+    lows = scale(arrays["minc"][band_keep], lo, hi, PRICE_TOP, PRICE_HEIGHT)
+    highs = scale(arrays["maxc"][band_keep], lo, hi, PRICE_TOP, PRICE_HEIGHT)
+
+    buy = np.nan_to_num(arrays["zmn"])
+    sell = np.nan_to_num(arrays["zmp"])
+    volume_max = max(float(buy.max()), float(sell.max()), 1e-9)
+    baseline = VOLUME_TOP + VOLUME_HEIGHT / 2
+    half_height = VOLUME_HEIGHT / 2
+    bar_width = max(step * 0.8, 0.5)
+
+    parts = [
+        f"<svg class='chart' xmlns='http://www.w3.org/2000/svg' width='{width}' height='{HEIGHT}' "
+        f"viewBox='0 0 {width} {HEIGHT}' role='img' "
+        f"aria-label='Weighted price with min/max band and buy/sell volume per interval'>",
+    ]
+
+    slot = int(np.searchsorted(index.positions, current)) if current is not None else n
+    if slot < n and index.positions[slot] == current:
+        x = MARGIN_LEFT + slot * step
+        parts.append(f"<rect x='{x:.1f}' y='{PRICE_TOP}' width='{step:.1f}' "
+                     f"height='{VOLUME_TOP + VOLUME_HEIGHT - PRICE_TOP}' "
+                     f"fill='{COLORS['current']}' fill-opacity='0.25'/>")
+
+    axis = COLORS["axis"]
+    if lo < 0 < hi:
+        zero = scale(0.0, lo, hi, PRICE_TOP, PRICE_HEIGHT)
+        parts.append(f"<path d='M{MARGIN_LEFT},{zero:.1f}H{width - MARGIN_RIGHT}' "
+                     f"stroke='{axis}' stroke-dasharray='3,3'/>")
+    parts.append(f"<path d='M{MARGIN_LEFT},{PRICE_TOP}V{PRICE_TOP + PRICE_HEIGHT}"
+                 f"H{width - MARGIN_RIGHT}M{MARGIN_LEFT},{baseline:.1f}H{width - MARGIN_RIGHT}' "
+                 f"stroke='{axis}' fill='none'/>")
+
+    parts.append(f"<path d='{band_path(xs[band_keep], lows, highs)}' "
+                 f"fill='{COLORS['band']}' fill-opacity='0.15'/>")
+    parts.append(f"<path d='{line_path(xs[keep], vp)}' stroke='{COLORS['vp']}' "
+                 f"stroke-width='1.5' fill='none'/>")
+    parts.append(f"<path d='{bars_path(xs, baseline - buy / volume_max * half_height, np.full(n, baseline), bar_width)}' "
+                 f"fill='{COLORS['buy']}'/>")
+    parts.append(f"<path d='{bars_path(xs, np.full(n, baseline), baseline + sell / volume_max * half_height, bar_width)}' "
+                 f"fill='{COLORS['sell']}'/>")
+
+    text = "font-family='Arial, sans-serif' font-size='10' fill='#555'"
+    parts.append(f"<text x='{MARGIN_LEFT - 4}' y='{PRICE_TOP + 8}' text-anchor='end' {text}>{hi:.0f}</text>")
+    parts.append(f"<text x='{MARGIN_LEFT - 4}' y='{PRICE_TOP + PRICE_HEIGHT}' text-anchor='end' {text}>{lo:.0f}</text>")
+    parts.append(f"<text x='{MARGIN_LEFT - 4}' y='{VOLUME_TOP + 8}' text-anchor='end' {text}>{volume_max:.0f}</text>")
+    parts.append(f"<text x='{MARGIN_LEFT - 4}' y='{baseline + 3:.1f}' text-anchor='end' {text}>MWh</text>")
+    for i in range(0, n, max(n // 6, 1)):
+        label = html.escape(str(labels[i]).split("-")[0].strip())
+        parts.append(f"<text x='{xs[i]:.1f}' y='{LABEL_Y}' text-anchor='middle' {text}>{label}</text>")
+
+    parts.append("</svg>")
+    return "".join(parts)
@@ -0,0 +1,158 @@
+"""
+Compact typed form of one delivery day.
+
+A DaySnapshot keeps only what selection and rendering need: one fixed-size
+float array per metric indexed by interval slot, the parsed start/end
+minutes, the interval labels as short byte strings and a validity bitmap
+(one bit per slot, set when the interval carries data). A day takes a few
+kilobytes instead of a DataFrame with its index, per-column blocks and
+boxed labels, so the daemon can keep many days resident.
+
+A snapshot can be passed wherever update_html.py expects the fetched
+DataFrame for selection and rendering: get_current_time_block,
+get_fallback_row, render_page, build_feed / write_feed, freshness_marker
+and archive_report.
+"""
+import numpy as np
+
+from update_html import (
+    EMPTY_COL,
+    INTERVAL_COL,
+    NUMERIC_COLS,
+    NUMERIC_KEYS,
+    IntervalIndex,
+    add_instant_columns,
+    build_interval_index,
+    delivery_day_of,
+)
+
+
+class SnapshotRows:
+    """
+    Positional row access, the snapshot's stand-in for DataFrame.iloc.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __getitem__(self, pos):
+        return self.snapshot.row(pos)
+
+
+class DaySnapshot:
+    """
+    One delivery day as typed arrays. Build it with from_frame.
+
+    labels      UTF-8 bytes array (dtype S), the "Časový interval" label per slot
+    starts/ends int16 minute-of-day of each interval
+    values      float array of shape (len(NUMERIC_KEYS), slots)
+    valid_bits  np.packbits of the per-slot "has data" flags
+    attrs       delivery_day, source_url and sha256, as in df.attrs
+    """
+
+    __slots__ = ("labels", "starts", "ends", "values", "valid_bits", "attrs", "_index")
+
+    def __init__(self, labels, starts, ends, values, valid_bits, attrs=None):
+        self.labels = labels
+        self.starts = starts
+        self.ends = ends
+        self.values = values
+        self.valid_bits = valid_bits
+        self.attrs = dict(attrs or {})
+        self._index = None
+
+    @classmethod
+    def from_frame(cls, df, index=None, dtype="float64"):
+        """
+        Build a snapshot from a DataFrame returned by read_report /
+        fetch_and_process_data. Rows whose interval label can't be parsed
+        (repeated headers, notes) are dropped; slots are the remaining rows
+        in order, like interval_table. float32 halves the metric arrays at
+        the cost of prices no longer round-tripping exactly.
+        """
+        if index is None:
+            index = build_interval_index(df)
+        pos = index.positions
+
+        labels = np.char.encode(df[INTERVAL_COL].to_numpy(dtype=object)[pos].astype(str), "utf-8")
+        values = np.empty((len(NUMERIC_KEYS), len(pos)), dtype=dtype)
+        for i, col in enumerate(NUMERIC_COLS):
+            values[i] = df[col].to_numpy(dtype="float64")[pos]
+        valid_bits = np.packbits(~index.is_empty[pos])
+
+        return cls(
+            labels,
+            index.starts.astype(np.int16),
+            index.ends.astype(np.int16),
+            values,
+            valid_bits,
+            df.attrs,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def is_empty(self):
+        return ~np.unpackbits(self.valid_bits, count=len(self)).astype(bool)
+
+    def is_valid(self, slot):
+        return bool((self.valid_bits[slot >> 3] >> (7 - (slot & 7))) & 1)
+
+    def column(self, key):
+        """
+        The metric array for one of NUMERIC_KEYS (a view, not a copy).
+        """
+        return self.values[NUMERIC_KEYS.index(key)]
+
+    def interval_index(self):
+        """
+        The IntervalIndex over the snapshot's slots, built once and kept.
+        """
+        if self._index is None:
+            self._index = IntervalIndex.from_minutes(self.starts, self.ends, self.is_empty)
+        return self._index
+
+    @property
+    def iloc(self):
+        return SnapshotRows(self)
+
+    def row(self, slot):
+        """
+        One slot as a dict keyed like a DataFrame row, so page_fields and
+        build_feed can use it as is.
+        """
+        if slot < 0:
+            slot += len(self)
+        if not 0 <= slot < len(self):
+            raise IndexError(f"slot {slot} out of range for {len(self)} intervals")
+        row = {INTERVAL_COL: self.labels[slot].decode("utf-8")}
+        for i, col in enumerate(NUMERIC_COLS):
+            row[col] = float(self.values[i, slot])
+        row[EMPTY_COL] = not self.is_valid(slot)
+        return row
+
+    def table(self, delivery_day=None):
+        """
+        The snapshot in interval_table layout (for the feed and the archive).
+        """
+        import pandas as pd
+
+        table = pd.DataFrame({
+            "slot": np.arange(len(self), dtype="int16"),
+            "interval": np.char.decode(self.labels, "utf-8").astype(object),
+            "start_minute": self.starts,
+            "end_minute": self.ends,
+        })
+        add_instant_columns(table, self.interval_index(), delivery_day or delivery_day_of(self))
+        for i, key in enumerate(NUMERIC_KEYS):
+            table[key] = self.values[i].astype("float64")
+        table["is_empty"] = self.is_empty
+        return table
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the snapshot's arrays.
+        """
+        return sum(a.nbytes for a in (self.labels, self.starts, self.ends, self.values, self.valid_bits))
@@ -0,0 +1,162 @@
+"""
+OpenMetrics text-file exporter for update_html.py runs.
+
+    python update_html.py --metrics-file /var/lib/node_exporter/textfile/ote.prom
+
+The file is rewritten atomically after every run (or daemon cycle) from the
+RunReport record, so a node-exporter textfile collector can scrape it
+without any extra service. Price gauges come from the row selected by
+get_current_time_block; runs that did not render re-export the values
+from current.json.
+"""
+import json
+import time
+from datetime import date
+
+from update_html import CURRENT_JSON, NUMERIC_KEYS, IntervalIndex, write_atomic
+
+PREFIX = "ote_"
+
+# Gauges exported from the selected row: (key, metric name, help text)
+ROW_GAUGES = [
+    ("vp", "weighted_price_eur_per_mwh", "Weighted average price (VP) of the current interval."),
+    ("minc", "min_price_eur_per_mwh", "Minimum price (MinC) of the current interval."),
+    ("maxc", "max_price_eur_per_mwh", "Maximum price (MaxC) of the current interval."),
+    ("pc", "last_price_eur_per_mwh", "Last price (PC) of the current interval."),
+    ("zm", "traded_volume_mwh", "Traded volume (ZM) of the current interval."),
+]
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value))
+
+
+class MetricsWriter:
+    """
+    Accumulates metric families and renders them in OpenMetrics text format.
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    def gauge(self, name, help_text, samples):
+        """
+        samples is a list of (labels dict, value); samples with a None value
+        are dropped, and families without samples are left out entirely.
+        """
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        name = PREFIX + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in sorted(labels.items()))
+            suffix = "{" + label_text + "}" if label_text else ""
+            self.lines.append(f"{name}{suffix} {format_value(value)}")
+
+    def render(self):
+        return "\n".join(self.lines + ["# EOF"]) + "\n"
+
+
+def interval_end(delivery_day, interval):
+    """
+    UTC epoch seconds of the end of an "HH:MM-HH:MM" interval on
+    delivery_day, or None if either can't be parsed. Only for records
+    without latest_end: a label alone can't say which pass of a repeated
+    hour it is, so the first one is taken.
+    """
+    try:
+        day = date.fromisoformat(delivery_day)
+    except (TypeError, ValueError):
+        return None
+    index = IntervalIndex([interval])
+    if not len(index):
+        return None
+    return int(index.instants(day)[1][0])
+
+
+def staleness_seconds(record, now=None):
+    """
+    Seconds since the end of the latest non-empty interval. Negative when
+    the workbook already has trades for intervals not yet delivered.
+    """
+    end = record.get("latest_end")
+    if end is None:
+        end = interval_end(record.get("delivery_day"), record.get("latest_interval"))
+    if end is None:
+        return None
+    now = now if now is not None else time.time()
+    return now - end
+
+
+def current_values(record, feed_file=CURRENT_JSON):
+    """
+    Values of the selected row: from the run record if this run rendered,
+    else from the feed written by the last run that did.
+    """
+    if record.get("current_values"):
+        return record.get("current_interval"), record["current_values"]
+    try:
+        with open(feed_file, "r", encoding="utf-8") as f:
+            current = json.load(f).get("current") or {}
+    except (OSError, ValueError):
+        return None, {}
+    return current.get("interval"), {key: current.get(key) for key in NUMERIC_KEYS}
+
+
+def build_metrics(record, feed_file=CURRENT_JSON, now=None):
+    """
+    Render the OpenMetrics text for one RunReport record.
+    """
+    counters = record.get("counters", {})
+    writer = MetricsWriter()
+
+    writer.gauge("stage_duration_seconds", "Wall-clock time of each pipeline stage in the last run.",
+                 [({"stage": stage}, seconds) for stage, seconds in sorted(record.get("stages_s", {}).items())])
+    writer.gauge("run_duration_seconds", "Total wall-clock time of the last run.",
+                 [({}, record.get("total_s"))])
+    writer.gauge("last_run_timestamp_seconds", "Unix time when the last run finished.",
+                 [({}, now if now is not None else time.time())])
+    writer.gauge("run_outcome", "Outcome of the last run (1 for the reported outcome).",
+                 [({"outcome": record["outcome"]}, 1)] if record.get("outcome") else [])
+    writer.gauge("http_status", "HTTP status of the last workbook request.",
+                 [({}, record.get("http_status"))])
+    writer.gauge("fetch_attempts", "Fetch attempts made in the last run.",
+                 [({}, counters.get("attempts", 0))])
+    writer.gauge("fetch_retries", "Retries (attempts after the first) in the last run.",
+                 [({}, max(counters.get("attempts", 0) - 1, 0))])
+    writer.gauge("fetch_errors", "Failed fetch attempts in the last run.",
+                 [({}, counters.get("errors", 0))])
+    writer.gauge("bytes_downloaded", "Bytes downloaded in the last run.",
+                 [({}, counters.get("bytes_downloaded", 0))])
+    writer.gauge("rows_parsed", "Workbook rows parsed in the last run.",
+                 [({}, counters.get("rows_parsed", 0))])
+    writer.gauge("peak_rss_bytes", "Peak resident memory of the process.",
+                 [({}, record["peak_rss_kb"] * 1024 if record.get("peak_rss_kb") is not None else None)])
+    writer.gauge("data_staleness_seconds", "Seconds since the end of the latest non-empty interval.",
+                 [({}, staleness_seconds(record, now))])
+
+    interval, values = current_values(record, feed_file)
+    writer.gauge("fallback_active", "1 if the page shows fallback data instead of the current interval.",
+                 [({}, record.get("fallback"))])
+    writer.gauge("current_interval_info", "Delivery interval the price gauges refer to.",
+                 [({"interval": interval, "delivery_day": record.get("delivery_day") or ""}, 1)] if interval else [])
+    for key, name, help_text in ROW_GAUGES:
+        writer.gauge(name, help_text, [({}, values.get(key))])
+    return writer.render()
+
+
+def write_metrics(path, record, feed_file=CURRENT_JSON):
+    """
+    Atomically write the metrics file, as the textfile collector expects.
+    """
+    write_atomic(path, build_metrics(record, feed_file))
@@ -0,0 +1,281 @@
+"""
+Resample the 15-minute intervals into the products we trade: hours,
+4-hour blocks, peak / off-peak and base.
+
+    python resample.py --product hour                      # today's report
+    python resample.py --from 2025-10-01 --to 2026-09-30 --product block4
+    python resample.py --from 2026-01-01 --to 2026-03-31 --db data/ote.sqlite --csv q1.csv
+
+Products follow the Prague clock: an hour or a block is a range of local
+clock hours (the hour repeated when the clocks go back is two separate
+hours; the 00-04 block on that day lasts five), peak is 08:00-20:00 on
+weekdays, off-peak the rest of the day and base the whole day. Empty
+intervals are left out.
+
+Each product row has the delivery day, a label, the first start and last
+end instant, the number of intervals with data, summed zm / zmn / zmp
+(MWh), the volume-weighted price vwap (sum of vp x zm over sum of zm),
+the lowest minc, the highest maxc, open (first vp) and close (last pc,
+vp if there is none). Everything is computed with sorted reductions over
+arrays, one pass per product, so a year of intervals takes milliseconds.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from update_html import (
+    NUMERIC_KEYS,
+    FetchError,
+    fetch_and_process_data,
+    interval_table,
+    json_number,
+    local_midnight,
+    prague_tz,
+)
+
+PRODUCTS = ["hour", "block4", "peak", "offpeak", "base"]
+
+PEAK_HOURS = (8, 20)
+
+SUMMED_KEYS = ["zm", "zmn", "zmp"]
+
+RESULT_COLUMNS = (
+    ["product", "delivery_day", "label", "start_utc", "end_utc", "intervals"]
+    + SUMMED_KEYS
+    + ["vwap", "minc", "maxc", "open", "close"]
+)
+
+
+def as_table(data):
+    """
+    An interval table (see interval_table) for a fetched DataFrame or
+    DaySnapshot; archive frames and interval tables are used as they are.
+    """
+    if isinstance(data, pd.DataFrame) and "start_utc" in data.columns:
+        return data
+    return interval_table(data)
+
+
+def epoch_seconds(column):
+    return pd.to_datetime(column, utc=True).dt.as_unit("s").astype("int64").to_numpy()
+
+
+def local_clock(starts):
+    """
+    Local day number (days since 1970-01-01), clock hour and weekday
+    (Monday = 0) of UTC epoch seconds, converting the time zone once.
+    """
+    utc = pd.DatetimeIndex(starts.astype("datetime64[s]")).tz_localize("UTC")
+    offsets = (utc.tz_convert(prague_tz()).tz_localize(None) - utc.tz_localize(None)).total_seconds()
+    local = starts + offsets.to_numpy(dtype="int64")
+    day = local // 86400
+    return day, (local % 86400) // 3600, (day + 3) % 7
+
+
+def group_codes(product, starts, day, hour, weekday):
+    """
+    One integer per interval; equal codes form one product row.
+    """
+    if product == "hour":
+        return starts // 3600
+    if product == "block4":
+        return day * 6 + hour // 4
+    if product in ("peak", "offpeak"):
+        return day * 2 + is_peak(hour, weekday)
+    if product == "base":
+        return day
+    raise ValueError(f"Unknown product '{product}'; expected one of {', '.join(PRODUCTS)}.")
+
+
+def is_peak(hour, weekday):
+    return (weekday < 5) & (hour >= PEAK_HOURS[0]) & (hour < PEAK_HOURS[1])
+
+
+def labels(product, hour):
+    """
+    Labels for product rows given the local hour their first interval
+    starts in.
+    """
+    if product == "hour":
+        return [f"{h:02d}:00-{(h + 1) % 24:02d}:00" for h in hour]
+    if product == "block4":
+        return [f"{h // 4 * 4:02d}:00-{(h // 4 * 4 + 4) % 24:02d}:00" for h in hour]
+    return [product] * len(hour)
+
+
+def reduce_groups(codes, columns):
+    """
+    Sort by code and reduce every run of equal codes. Returns the index of
+    each group's first row in sorted order, the sort order and the sorted
+    columns.
+    """
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    firsts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    return firsts, order, {key: values[order] for key, values in columns.items()}
+
+
+def first_valid(values, firsts):
+    """
+    The first non-NaN value of each group (NaN if it has none).
+    """
+    n = len(values)
+    pos = np.minimum.reduceat(np.where(np.isnan(values), n, np.arange(n)), firsts)
+    return np.append(values, np.nan)[pos]
+
+
+def last_valid(values, firsts):
+    """
+    The last non-NaN value of each group (NaN if it has none).
+    """
+    pos = np.maximum.reduceat(np.where(np.isnan(values), -1, np.arange(len(values))), firsts)
+    return np.append(values, np.nan)[pos]
+
+
+def resample_product(product, columns, clock):
+    starts = columns["start"]
+    day, hour, weekday = clock
+    codes = group_codes(product, starts, day, hour, weekday)
+    if product == "peak":
+        keep = is_peak(hour, weekday)
+    elif product == "offpeak":
+        keep = ~is_peak(hour, weekday)
+    else:
+        keep = np.ones(len(starts), dtype=bool)
+    if not keep.any():
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    columns = {key: values[keep] for key, values in columns.items()}
+    columns["day"] = day[keep]
+    columns["hour"] = hour[keep]
+    firsts, _, c = reduce_groups(codes[keep], columns)
+
+    vp, zm = c["vp"], c["zm"]
+    weighted = ~np.isnan(vp) & ~np.isnan(zm)
+    value = np.add.reduceat(np.where(weighted, vp * zm, 0.0), firsts)
+    volume = np.add.reduceat(np.where(weighted, zm, 0.0), firsts)
+
+    result = {
+        "product": product,
+        "delivery_day": np.datetime_as_string(c["day"][firsts].astype("datetime64[D]")),
+        "label": labels(product, c["hour"][firsts]),
+        "start_utc": pd.to_datetime(np.minimum.reduceat(c["start"], firsts), unit="s", utc=True),
+        "end_utc": pd.to_datetime(np.maximum.reduceat(c["end"], firsts), unit="s", utc=True),
+        "intervals": np.diff(np.r_[firsts, len(vp)]),
+    }
+    for key in SUMMED_KEYS:
+        result[key] = np.add.reduceat(np.nan_to_num(c[key]), firsts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["vwap"] = np.where(volume > 0, value / volume, np.nan)
+    result["minc"] = np.fmin.reduceat(c["minc"], firsts)
+    result["maxc"] = np.fmax.reduceat(c["maxc"], firsts)
+    result["open"] = first_valid(vp, firsts)
+    result["close"] = last_valid(np.where(np.isnan(c["pc"]), vp, c["pc"]), firsts)
+    return pd.DataFrame(result, columns=RESULT_COLUMNS)
+
+
+def resample(data, products=PRODUCTS):
+    """
+    Resample data (a fetched DataFrame or DaySnapshot, an interval table or
+    an archive.read_range frame, possibly spanning many days) into the
+    given products. Returns one frame, grouped by product in the order
+    given and ordered by time within each.
+    """
+    table = as_table(data)
+    table = table[~table["is_empty"].astype(bool) & table["start_utc"].notna()]
+    columns = {
+        "start": epoch_seconds(table["start_utc"]),
+        "end": epoch_seconds(table["end_utc"]),
+    }
+    for key in NUMERIC_KEYS:
+        columns[key] = table[key].to_numpy(dtype="float64")
+    clock = local_clock(columns["start"])
+
+    frames = [resample_product(product, columns, clock) for product in products]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def feed_products(data, products=PRODUCTS):
+    """
+    Products of one day as compact columns for feed.json, keyed by product.
+    """
+    frame = resample(data, products)
+    feed = {}
+    for product in products:
+        rows = frame[frame["product"] == product]
+        columns = {"label": rows["label"].tolist(), "intervals": [int(n) for n in rows["intervals"]]}
+        for key in RESULT_COLUMNS[6:]:
+            columns[key] = [json_number(v) for v in rows[key]]
+        feed[product] = columns
+    return feed
+
+
+def history(start, end, archive_dir=None, db_file=None):
+    """
+    Stored intervals for the delivery days start..end (inclusive), from
+    the Parquet archive or, if db_file is given, the SQLite store.
+    """
+    first, last = local_midnight(start), local_midnight(end + timedelta(days=1))
+    if db_file:
+        import store
+
+        with store.IntradayStore(db_file) as db:
+            frame = pd.DataFrame(db.between(first, last))
+        if frame.empty:
+            return pd.DataFrame(columns=["start_utc", "end_utc", "is_empty"] + NUMERIC_KEYS)
+        for col in ("start_utc", "end_utc"):
+            frame[col] = pd.to_datetime(frame[col], unit="s", utc=True)
+        frame[NUMERIC_KEYS] = frame[NUMERIC_KEYS].astype("float64")
+        return frame
+
+    import archive
+
+    return archive.read_range(first, last, archive_dir or archive.ARCHIVE_DIR)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Resample OTE intraday intervals into hourly and block products.")
+    parser.add_argument("--product", action="append", choices=PRODUCTS,
+                        help="Product to compute; may be repeated (default: all).")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="First delivery day (YYYY-MM-DD) of stored history; without it today's report is fetched.")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat,
+                        help="Last delivery day (default: the same as --from).")
+    parser.add_argument("--archive-dir", default=os.path.join("data", "archive"))
+    parser.add_argument("--db", default=None, help="Read history from this SQLite store instead of the archive.")
+    parser.add_argument("--csv", help="Write the result to this CSV file instead of printing it.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.start:
+        data = history(args.start, args.end or args.start, args.archive_dir, args.db)
+    else:
+        # Leave ote_cache.json alone, it belongs to update_html.py's runs
+        try:
+            data = fetch_and_process_data(use_cache=False)
+        except FetchError as e:
+            print(e)
+            sys.exit(1)
+
+    started = time.perf_counter()
+    result = resample(data, args.product or PRODUCTS)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if args.csv:
+        result.to_csv(args.csv, index=False)
+        print(f"Wrote {len(result)} row(s) to '{args.csv}'.")
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(result.to_string(index=False))
+    print(f"({len(data)} interval(s) resampled in {elapsed:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
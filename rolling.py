@@ -0,0 +1,345 @@
+"""
+Rolling statistics of the weighted price (VP) and an anomaly flag for the
+current interval.
+
+Two windows are kept: for every interval of the day (by start minute) the
+VP of that interval on the last WINDOW_DAYS days with data, and the VP of
+the last RECENT_INTERVALS intervals across day boundaries. Like the day
+aggregates, only intervals that have ended are folded in, each exactly
+once: the state (one JSON file per rendered page under data/rolling/)
+holds the window contents with their running mean / variance and sorted
+copy, and the end instant up to which intervals have been folded. A run pushes the
+intervals that ended since then, stopping at an ended interval that has
+no VP yet (for up to LATE_GRACE) so late-published data is not skipped.
+Each push updates the mean and variance in O(1) (Welford, with removal
+of the value leaving the window) and keeps a sorted copy for percentiles
+with bisect.insort, an O(log n) search plus an O(n) list shift for windows
+of at most 96 values. Loading restores the windows as saved, and only
+those of the intervals a run touches, so nothing is replayed.
+
+On the first run, or after a gap, the missing intervals are read once
+from the Parquet archive.
+
+The current row is flagged as an anomaly when its VP is at least
+Z_THRESHOLD standard deviations from the mean of either window (given
+MIN_SAMPLES values in it).
+"""
+import bisect
+import json
+import math
+import os
+from collections import deque
+from datetime import datetime, timedelta
+
+from update_html import (
+    INTERVAL_COL,
+    NUMERIC_COLS,
+    NUMERIC_KEYS,
+    interval_table,
+    page_state_file,
+    prague_tz,
+    to_float,
+    write_atomic,
+)
+
+ROLLING_DIR = os.path.join("data", "rolling")
+WINDOW_DAYS = 30
+RECENT_INTERVALS = 96
+Z_THRESHOLD = 3.0
+MIN_SAMPLES = 8
+
+# How long after its end an interval without a VP is waited for before it
+# is taken as having no trades and skipped
+LATE_GRACE = timedelta(hours=1)
+
+VP_COL = NUMERIC_COLS[NUMERIC_KEYS.index("vp")]
+
+
+class RollingWindow:
+    """
+    The last `size` values pushed, with running mean / variance and a
+    sorted copy for percentiles.
+    """
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque()
+        self.sorted = []
+        self.mean = 0.0
+        self.m2 = 0.0
+        for value in values:
+            self.push(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def restore(cls, size, saved):
+        """
+        A window as saved by to_dict, without replaying its values.
+        """
+        window = cls(size)
+        window.values = deque(float(v) for v in saved["values"])
+        window.sorted = [float(v) for v in saved["sorted"]]
+        window.mean = float(saved["mean"])
+        window.m2 = float(saved["m2"])
+        return window
+
+    def to_dict(self):
+        return {"values": list(self.values), "sorted": self.sorted, "mean": self.mean, "m2": self.m2}
+
+    def push(self, value):
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        delta = value - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (value - self.mean)
+        if len(self.values) > self.size:
+            self._remove(self.values.popleft())
+
+    def _remove(self, value):
+        del self.sorted[bisect.bisect_left(self.sorted, value)]
+        n = len(self.values)
+        delta = value - self.mean
+        self.mean -= delta / n
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation (None below two values).
+        """
+        if len(self.values) < 2:
+            return None
+        return math.sqrt(self.m2 / (len(self.values) - 1))
+
+    def percentile(self, q):
+        """
+        The q-th percentile (0-100), linearly interpolated like numpy's
+        default.
+        """
+        if not self.sorted:
+            return None
+        pos = (len(self.sorted) - 1) * q / 100
+        low = int(pos)
+        high = min(low + 1, len(self.sorted) - 1)
+        return self.sorted[low] + (self.sorted[high] - self.sorted[low]) * (pos - low)
+
+    def rank(self, value):
+        """
+        Percentage of window values at or below value.
+        """
+        if not self.sorted:
+            return None
+        return 100.0 * bisect.bisect_right(self.sorted, value) / len(self.sorted)
+
+    def zscore(self, value):
+        std = self.std
+        if std is None or std == 0 or len(self.values) < MIN_SAMPLES:
+            return None
+        return (value - self.mean) / std
+
+    def describe(self, value):
+        """
+        Window figures and the position of value within them.
+        """
+        if not self.values:
+            return {"samples": 0}
+        return {
+            "samples": len(self.values),
+            "mean": self.mean,
+            "std": self.std,
+            "p10": self.percentile(10),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "percentile": self.rank(value) if value is not None else None,
+            "z": self.zscore(value) if value is not None else None,
+        }
+
+
+def state_path(key, state_dir=ROLLING_DIR):
+    """
+    The state file of the page at path `key` (e.g. "index.html").
+    """
+    return page_state_file(key, state_dir)
+
+
+class RollingState:
+    """
+    Both windows and the fold cursor of one page, loaded from and saved to
+    JSON. Per-interval windows are restored only when first used.
+    """
+
+    def __init__(self, folded_until=None, by_interval=None, recent=None):
+        self.folded_until = folded_until
+        self.saved = dict(by_interval or {})
+        self.by_interval = {}
+        self.recent = RollingWindow.restore(RECENT_INTERVALS, recent) if recent else RollingWindow(RECENT_INTERVALS)
+
+    @classmethod
+    def load(cls, state_file):
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return cls(state.get("folded_until"), state.get("by_interval"), state.get("recent"))
+        except (OSError, ValueError, AttributeError, TypeError, KeyError):
+            return cls()
+
+    def save(self, state_file):
+        by_interval = dict(self.saved)
+        by_interval.update({str(minute): window.to_dict() for minute, window in self.by_interval.items()})
+        state = {
+            "folded_until": self.folded_until,
+            "by_interval": by_interval,
+            "recent": self.recent.to_dict(),
+        }
+        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+        write_atomic(state_file, json.dumps(state, sort_keys=True))
+
+    def peek(self, minute):
+        """
+        The window of one interval of the day, or None if there is none.
+        """
+        if minute not in self.by_interval and str(minute) in self.saved:
+            self.by_interval[minute] = RollingWindow.restore(WINDOW_DAYS, self.saved[str(minute)])
+        return self.by_interval.get(minute)
+
+    def window(self, minute):
+        if self.peek(minute) is None:
+            self.by_interval[minute] = RollingWindow(WINDOW_DAYS)
+        return self.by_interval[minute]
+
+    def fold(self, table, now):
+        """
+        Push every interval of table (an interval table or archive frame,
+        ordered by start) that ended by now and is past the cursor.
+        Returns the number of values pushed.
+        """
+        import numpy as np
+
+        if table.empty or table["start_utc"].isna().all():
+            return 0
+        table = table[table["start_utc"].notna()]
+        starts = table["start_utc"].dt.as_unit("s").astype("int64").to_numpy()
+        ends = table["end_utc"].dt.as_unit("s").astype("int64").to_numpy()
+        ended = ends <= now.timestamp()
+        if self.folded_until is not None:
+            ended &= starts >= self.folded_until
+        if not ended.any():
+            return 0
+
+        rows = table[ended]
+        starts, ends = starts[ended], ends[ended]
+        vp = rows["vp"].to_numpy(dtype="float64")
+        usable = ~rows["is_empty"].to_numpy(dtype=bool) & ~np.isnan(vp)
+
+        # Stop at the first row without a VP that may still be published;
+        # later rows wait for it so the recent window stays in time order
+        waiting = np.flatnonzero(~usable & (ends > now.timestamp() - LATE_GRACE.total_seconds()))
+        stop = int(waiting[0]) if len(waiting) else len(rows)
+        usable[stop:] = False
+        for minute, value in zip(rows["start_minute"].to_numpy()[usable], vp[usable]):
+            self.window(int(minute)).push(float(value))
+            self.recent.push(float(value))
+        self.folded_until = int(starts[stop]) if stop < len(rows) else int(ends.max())
+        return int(usable.sum())
+
+
+def catch_up(state, table, archive_dir, now):
+    """
+    Fold archived intervals between the cursor (at most WINDOW_DAYS days
+    back) and the first interval of table.
+    """
+    import archive
+
+    first = table["start_utc"].min()
+    if first != first:
+        return 0
+    first = first.to_pydatetime()
+    start = first - timedelta(days=WINDOW_DAYS)
+    if state.folded_until is not None:
+        start = max(start, datetime.fromtimestamp(state.folded_until, first.tzinfo))
+    if start >= first:
+        return 0
+    return state.fold(archive.read_range(start, first, archive_dir), now)
+
+
+def current_minute(table, row):
+    """
+    Start minute of the row chosen by get_current_time_block.
+    """
+    matches = table.loc[table["interval"] == str(row.get(INTERVAL_COL, "")), "start_minute"]
+    return int(matches.iloc[0]) if len(matches) else None
+
+
+def assess(state, table, row):
+    """
+    The current row's VP against both windows, with the anomaly flag.
+    """
+    if row is None:
+        return None
+    vp = to_float(row.get(VP_COL))
+    vp = None if vp != vp else vp
+    minute = current_minute(table, row)
+    by_interval = (state.peek(minute) or RollingWindow(WINDOW_DAYS)).describe(vp)
+    recent = state.recent.describe(vp)
+    scores = [w["z"] for w in (by_interval, recent) if w.get("z") is not None]
+    return {
+        "interval": str(row.get(INTERVAL_COL, "")),
+        "vp": vp,
+        "interval_of_day": by_interval,
+        "recent": recent,
+        "anomaly": any(abs(z) >= Z_THRESHOLD for z in scores),
+    }
+
+
+def rolling_stats(df, row, index=None, archive_dir=None, key="index.html", state_dir=ROLLING_DIR, now=None):
+    """
+    Load the state of the page `key`, fold in newly ended intervals (from
+    the archive first if the state is behind df's day), save it if the
+    cursor moved and assess row.
+    """
+    now = now or datetime.now(prague_tz())
+    table = interval_table(df, index)
+    state_file = state_path(key, state_dir)
+    state = RollingState.load(state_file)
+    cursor = state.folded_until
+    if archive_dir and os.path.isdir(archive_dir):
+        catch_up(state, table, archive_dir, now)
+    state.fold(table, now)
+    if state.folded_until != cursor:
+        state.save(state_file)
+    return assess(state, table, row)
+
+
+def fmt(value, digits=2, sign=False):
+    if value is None:
+        return "NA"
+    return f"{value:+.{digits}f}" if sign else f"{value:.{digits}f}"
+
+
+def format_html(stats):
+    """
+    Window figures for the current VP, plus a warning line when it is an
+    anomaly.
+    """
+    if not stats or stats["vp"] is None:
+        return ""
+    parts = []
+    for name, key in ((f"{stats['interval']} over {WINDOW_DAYS} days", "interval_of_day"),
+                      (f"last {RECENT_INTERVALS} intervals", "recent")):
+        w = stats[key]
+        if not w["samples"]:
+            continue
+        parts.append(
+            f"{name}: mean {fmt(w['mean'])}, sd {fmt(w['std'])}, "
+            f"p10-p90 {fmt(w['p10'])}-{fmt(w['p90'])}, "
+            f"VP at p{fmt(w['percentile'], 0)} (z {fmt(w['z'], 1, sign=True)})"
+        )
+    if not parts:
+        return ""
+    html = "<p class='rolling'>VP vs " + " | ".join(parts) + "</p>"
+    if stats["anomaly"]:
+        html += (f"\n    <p class='warning'>Unusual price: VP {fmt(stats['vp'])} is far from "
+                 "its recent range.</p>")
+    return html
@@ -0,0 +1,246 @@
+"""
+Embedded SQLite store of the fetched intraday data, for ad-hoc queries.
+
+    python store.py load-archive                    # import the Parquet archive
+    python store.py stats 17:00-17:15 --days 90     # min/max/avg over 90 days
+    python store.py sql "SELECT delivery_day, MAX(maxc) FROM intervals GROUP BY 1"
+
+update_html.py upserts every fetched workbook (see --db). One row per
+delivery day and slot, with the same short columns as the archive; start
+and end instants are stored as UTC epoch seconds.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from update_html import NUMERIC_KEYS, interval_table, prague_tz
+
+DB_FILE = os.path.join("data", "ote.sqlite")
+
+COLUMNS = (
+    ["delivery_day", "slot", "interval", "start_minute", "end_minute", "start_utc", "end_utc"]
+    + NUMERIC_KEYS
+    + ["is_empty", "fetched_at"]
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS intervals (
+    delivery_day TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    interval TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL,
+    start_utc INTEGER,
+    end_utc INTEGER,
+    {", ".join(f"{key} REAL" for key in NUMERIC_KEYS)},
+    is_empty INTEGER NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (delivery_day, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS intervals_day_start ON intervals (delivery_day, start_minute);
+CREATE INDEX IF NOT EXISTS intervals_start_day ON intervals (start_minute, delivery_day);
+CREATE INDEX IF NOT EXISTS intervals_start_utc ON intervals (start_utc);
+"""
+
+# Per slot the new row wins, except that an empty new row never replaces
+# data, the same rule as archive.merge_day
+UPSERT = f"""
+INSERT INTO intervals ({", ".join(COLUMNS)}) VALUES ({", ".join("?" for _ in COLUMNS)})
+ON CONFLICT (delivery_day, slot) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in COLUMNS[2:])}
+WHERE excluded.is_empty = 0 OR intervals.is_empty = 1
+"""
+
+
+def parse_start(interval):
+    """
+    Minute of day of an "HH:MM-HH:MM" interval (or a plain "HH:MM").
+    """
+    start = interval.split("-")[0].strip()
+    hours, minutes = start.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def epoch_seconds(values):
+    """
+    UTC epoch seconds of a datetime column, None for NaT.
+    """
+    return [None if v is None or v != v else int(v.timestamp()) for v in values.astype(object)]
+
+
+class IntradayStore:
+    """
+    Connection to the SQLite store. Use as a context manager, or call
+    close() when done.
+    """
+
+    def __init__(self, path=DB_FILE):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_table(self, table, delivery_day, fetched_at=None):
+        """
+        Upsert an interval_table / archive frame for one delivery day in a
+        single transaction. Returns the number of rows written.
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        if "fetched_at" in table.columns:
+            fetched = epoch_seconds(table["fetched_at"])
+        else:
+            fetched = [int(fetched_at.timestamp())] * len(table)
+        columns = [table[c].tolist() for c in ["slot", "interval", "start_minute", "end_minute"]]
+        columns += [epoch_seconds(table["start_utc"]), epoch_seconds(table["end_utc"])]
+        columns += [[None if v != v else v for v in table[key].tolist()] for key in NUMERIC_KEYS]
+        columns += [[int(v) for v in table["is_empty"].tolist()], fetched]
+
+        rows = [(str(delivery_day),) + values for values in zip(*columns)]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(UPSERT, rows)
+            return self.conn.total_changes - before
+
+    def upsert(self, df, delivery_day=None, fetched_at=None):
+        """
+        Upsert a DataFrame (or DaySnapshot) from fetch_and_process_data.
+        delivery_day defaults to df.attrs["delivery_day"].
+        """
+        delivery_day = delivery_day or df.attrs.get("delivery_day")
+        if not delivery_day:
+            raise ValueError("Unknown delivery day; cannot store.")
+        day = delivery_day if isinstance(delivery_day, date) else date.fromisoformat(delivery_day)
+        return self.upsert_table(interval_table(df, delivery_day=day), day.isoformat(), fetched_at)
+
+    def query(self, sql, params=()):
+        """
+        Run any SQL against the store and return the rows as dicts.
+        """
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def day(self, delivery_day):
+        """
+        Every stored interval of one delivery day, by slot.
+        """
+        return self.query("SELECT * FROM intervals WHERE delivery_day = ? ORDER BY slot", (str(delivery_day),))
+
+    def days(self):
+        return [date.fromisoformat(row["delivery_day"]) for row in
+                self.query("SELECT DISTINCT delivery_day FROM intervals ORDER BY delivery_day")]
+
+    def interval_history(self, interval, days=90, until=None, keys=NUMERIC_KEYS):
+        """
+        The given interval (e.g. "17:00-17:15") on each delivery day of the
+        `days` days up to `until` (default: today), oldest first. Empty
+        intervals are left out.
+        """
+        first, last = self.day_window(days, until)
+        return self.query(
+            f"SELECT delivery_day, interval, {', '.join(keys)} FROM intervals "
+            "WHERE start_minute = ? AND delivery_day BETWEEN ? AND ? AND is_empty = 0 "
+            "ORDER BY delivery_day, slot",
+            (parse_start(interval), first, last),
+        )
+
+    def interval_stats(self, interval, days=90, until=None):
+        """
+        Summary of one interval over `days` days: lowest minimum price,
+        highest maximum price, mean weighted price, total volume and the
+        number of days with data.
+        """
+        first, last = self.day_window(days, until)
+        rows = self.query(
+            "SELECT MIN(minc) AS min_price, MAX(maxc) AS max_price, AVG(vp) AS avg_price, "
+            "SUM(zm) AS volume, COUNT(*) AS days FROM intervals "
+            "WHERE start_minute = ? AND delivery_day BETWEEN ? AND ? AND is_empty = 0",
+            (parse_start(interval), first, last),
+        )
+        return rows[0]
+
+    def between(self, start, end):
+        """
+        Stored intervals starting in [start, end) (aware datetimes), by time.
+        """
+        return self.query(
+            "SELECT * FROM intervals WHERE start_utc >= ? AND start_utc < ? ORDER BY start_utc",
+            (int(start.timestamp()), int(end.timestamp())),
+        )
+
+    @staticmethod
+    def day_window(days, until=None):
+        until = until or datetime.now(prague_tz()).date()
+        return (until - timedelta(days=days - 1)).isoformat(), until.isoformat()
+
+
+def load_archive(store, archive_dir):
+    """
+    Import every day of the Parquet archive into the store.
+    Returns the number of rows written.
+    """
+    import archive
+
+    written = 0
+    for day in archive.list_days(archive_dir):
+        written += store.upsert_table(archive.read_day(day, archive_dir), day.isoformat())
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query the SQLite store of OTE intraday data.")
+    parser.add_argument("--db", default=DB_FILE, help=f"Database file (default: {DB_FILE}).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("load-archive", help="Import the Parquet archive.")
+    load.add_argument("--archive-dir", default=os.path.join("data", "archive"))
+
+    stats = commands.add_parser("stats", help="Summary of one interval over recent days.")
+    stats.add_argument("interval", help='Interval label, e.g. "17:00-17:15".')
+    stats.add_argument("--days", type=int, default=90)
+    stats.add_argument("--history", action="store_true", help="Also print the value of every day.")
+
+    sql = commands.add_parser("sql", help="Run an SQL query against the intervals table.")
+    sql.add_argument("query")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    with IntradayStore(args.db) as store:
+        if args.command == "load-archive":
+            written = load_archive(store, args.archive_dir)
+            print(f"Imported {written} row(s) from '{args.archive_dir}'.")
+        elif args.command == "stats":
+            if args.history:
+                for row in store.interval_history(args.interval, args.days):
+                    print(row)
+            print(store.interval_stats(args.interval, args.days))
+        else:
+            try:
+                for row in store.query(args.query):
+                    print(row)
+            except sqlite3.Error as e:
+                print(f"Query failed: {e}")
+                sys.exit(1)
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
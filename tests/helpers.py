@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the tests: puts the repository (and benchmarks/, for
+the synthetic workbooks) on sys.path and builds reports for a fixed day.
+"""
+import os
+import sys
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from synthetic_workbooks import make_workbook  # noqa: E402
+from update_html import build_interval_index, prague_tz, read_report  # noqa: E402
+
+DAY = date(2026, 1, 15)
+
+
+def report(filled=None, day=DAY, **params):
+    """
+    A parsed synthetic workbook for day with its IntervalIndex; filled
+    limits the intervals with data, params go to make_workbook.
+    """
+    df = read_report(make_workbook(day=day, filled=filled, seed=1, **params))
+    df.attrs["delivery_day"] = day.isoformat()
+    return df, build_interval_index(df)
+
+
+def at(hour, minute):
+    return prague_tz().localize(datetime(DAY.year, DAY.month, DAY.day, hour, minute))
@@ -0,0 +1,76 @@
+import math
+import os
+import tempfile
+import threading
+import unittest
+
+from helpers import at, report
+
+import aggregates
+
+
+class IncrementalAggregatesTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def assertSameFigures(self, incremental, scratch):
+        self.assertEqual(incremental.keys(), scratch.keys())
+        for key, value in scratch.items():
+            if isinstance(value, float):
+                self.assertTrue(math.isclose(incremental[key], value), (key, incremental[key], value))
+            else:
+                self.assertEqual(incremental[key], value, key)
+
+    def test_late_interval_is_folded_once_published(self):
+        # At 10:20 the workbook only has data up to 09:45-10:00; the
+        # 10:00-10:15 interval has ended but is still empty
+        stale, stale_index = report(filled=40)
+        aggregates.day_aggregates(stale, stale_index, "page", self.state_dir, at(10, 20))
+
+        full, full_index = report()
+        incremental = aggregates.day_aggregates(full, full_index, "page", self.state_dir, at(10, 35))
+        scratch = aggregates.summary(aggregates.update(None, full, full_index, at(10, 35)))
+        self.assertEqual(incremental["intervals"], 42)
+        self.assertSameFigures(incremental, scratch)
+
+    def test_rerun_folds_nothing_new(self):
+        df, index = report()
+        first = aggregates.day_aggregates(df, index, "page", self.state_dir, at(12, 0))
+        mtime = os.path.getmtime(aggregates.state_path("page", self.state_dir))
+        self.assertEqual(aggregates.day_aggregates(df, index, "page", self.state_dir, at(12, 0)), first)
+        self.assertEqual(os.path.getmtime(aggregates.state_path("page", self.state_dir)), mtime)
+
+    def test_matches_scratch_through_the_day(self):
+        df, index = report()
+        for hour in (1, 6, 11, 17, 23):
+            incremental = aggregates.day_aggregates(df, index, "page", self.state_dir, at(hour, 5))
+            scratch = aggregates.summary(aggregates.update(None, df, index, at(hour, 5)))
+            self.assertSameFigures(incremental, scratch)
+
+    def test_concurrent_pages_keep_their_own_state(self):
+        df, index = report()
+        keys = [f"page{i}/index.html" for i in range(8)]
+        errors = []
+
+        def render(key):
+            try:
+                for hour in range(1, 24):
+                    aggregates.day_aggregates(df, index, key, self.state_dir, at(hour, 5))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=render, args=(key,)) for key in keys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        scratch = aggregates.summary(aggregates.update(None, df, index, at(23, 5)))
+        for key in keys:
+            state = aggregates.load_state(aggregates.state_path(key, self.state_dir))
+            self.assertSameFigures(aggregates.summary(state), scratch)
+
+
+if __name__ == "__main__":
+    unittest.main()
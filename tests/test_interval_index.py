@@ -0,0 +1,61 @@
+import contextlib
+import io
+import unittest
+from datetime import date, datetime, timezone
+
+from helpers import report
+
+from update_html import MATCH_EXACT, day_slots, local_midnight
+
+# (delivery day, slots): clocks forward, an ordinary day, clocks back
+DAYS = [(date(2025, 3, 30), 92), (date(2026, 1, 15), 96), (date(2025, 10, 26), 100)]
+
+
+def moment(day, slot, minute=1):
+    """
+    A moment `minute` minutes into the slot-th quarter hour of day.
+    """
+    return datetime.fromtimestamp(local_midnight(day).timestamp() + slot * 900 + minute * 60, timezone.utc)
+
+
+class IntervalIndexTest(unittest.TestCase):
+    def test_every_slot_matches_its_row(self):
+        for day, slots in DAYS:
+            with self.subTest(day=day):
+                self.assertEqual(day_slots(day), slots)
+                df, index = report(day=day, slots=slots)
+                self.assertEqual(len(index.positions), slots)
+                starts, ends = index.instants(day)
+                midnight = int(local_midnight(day).timestamp())
+                self.assertEqual(starts.tolist(), [midnight + 900 * i for i in range(slots)])
+                self.assertEqual(ends.tolist(), [midnight + 900 * (i + 1) for i in range(slots)])
+                for slot in range(slots):
+                    self.assertEqual(index.lookup(moment(day, slot), day),
+                                     (MATCH_EXACT, int(index.positions[slot])), slot)
+
+    def test_multi_day_sheet_rolls_over(self):
+        day = date(2026, 1, 15)
+        df, index = report(day=day, days=2)
+        self.assertEqual(len(index.positions), 192)
+        kind, position = index.lookup(moment(date(2026, 1, 16), 20), day)
+        self.assertEqual((kind, position), (MATCH_EXACT, int(index.positions[116])))
+
+    def test_repeated_labels_stay_on_their_day(self):
+        # A 100-slot sheet for an ordinary day repeats 02:00-03:00 where
+        # the day has no repeated hour
+        day = date(2026, 1, 15)
+        df, index = report(day=day, slots=100)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            starts, ends = index.instants(day)
+        self.assertIn("Warning", output.getvalue())
+        self.assertLess(int(ends.max()), local_midnight(date(2026, 1, 16)).timestamp() + 1)
+        for slot in range(96):
+            kind, position = index.lookup(moment(day, slot), day)
+            self.assertEqual(kind, MATCH_EXACT, slot)
+            row = int(index.positions.searchsorted(position))
+            self.assertEqual(int(index.starts[row]), slot * 15, slot)
+
+
+if __name__ == "__main__":
+    unittest.main()
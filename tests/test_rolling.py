@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from helpers import at, report
+
+import rolling
+from update_html import get_current_time_block
+
+
+def stats(df, index, state_dir, now):
+    row, _ = get_current_time_block(df, now, index)
+    return rolling.rolling_stats(df, row, index, state_dir=state_dir, now=now)
+
+
+class RollingWindowTest(unittest.TestCase):
+    def test_matches_numpy(self):
+        values = np.random.default_rng(0).normal(50, 20, 300)
+        window = rolling.RollingWindow(30)
+        for i, value in enumerate(values):
+            window.push(float(value))
+            expected = values[max(0, i - 29):i + 1]
+            self.assertAlmostEqual(window.mean, expected.mean())
+            if len(expected) > 1:
+                self.assertAlmostEqual(window.std, expected.std(ddof=1))
+            self.assertAlmostEqual(window.percentile(90), np.percentile(expected, 90))
+
+
+class RollingStateTest(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+
+    def test_late_interval_enters_the_windows(self):
+        # At 10:20 the 10:00-10:15 interval has ended but has no data yet
+        stale, stale_index = report(filled=40)
+        stats(stale, stale_index, self.state_dir, at(10, 20))
+
+        full, full_index = report()
+        incremental = stats(full, full_index, self.state_dir, at(10, 35))
+        scratch = stats(full, full_index, tempfile.mkdtemp(), at(10, 35))
+        self.assertEqual(incremental["recent"]["samples"], 42)
+        self.assertEqual(incremental["recent"], scratch["recent"])
+
+        state = rolling.RollingState.load(rolling.state_path("index.html", self.state_dir))
+        self.assertEqual(len(state.window(600)), 1)
+
+    def test_reload_restores_windows_without_replay(self):
+        df, index = report()
+        first = stats(df, index, self.state_dir, at(18, 0))
+        again = stats(df, index, self.state_dir, at(18, 0))
+        self.assertEqual(first, again)
+
+    def test_pages_keep_separate_state(self):
+        df, index = report()
+        row, _ = get_current_time_block(df, at(12, 0), index)
+        rolling.rolling_stats(df, row, index, key="index.html", state_dir=self.state_dir, now=at(12, 0))
+        other = rolling.rolling_stats(df, row, index, key="reports/de/index.html", state_dir=self.state_dir,
+                                      now=at(6, 0))
+        self.assertEqual(other["recent"]["samples"], 24)
+        self.assertEqual(len(os.listdir(self.state_dir)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,141 +1,701 @@
-import requests
 import time
-from bs4 import BeautifulSoup
-import pandas as pd
+import codecs
+from html.parser import HTMLParser
 from io import BytesIO
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, date, timezone
+from string import Template
+from contextlib import contextmanager
+from contextvars import ContextVar
 import sys
+import importlib
+import argparse
+import os
+import json
+import hashlib
+import re
+import random
+
+# requests, numpy, pandas, pytz and the Excel readers are imported inside
+# the functions that need them. A run that ends in a 304 never pays for
+# pandas, and --help / --import-times start instantly.
+HEAVY_MODULES = ["requests", "pytz", "numpy", "pandas", "openpyxl", "xlrd", "pyarrow"]
+
+_prague_tz = None
+
+
+def prague_tz():
+    """
+    The Europe/Prague timezone, loading pytz on first use.
+    """
+    global _prague_tz
+    if _prague_tz is None:
+        import pytz
+        _prague_tz = pytz.timezone("Europe/Prague")
+    return _prague_tz
+
+
+def import_cost_report(modules=HEAVY_MODULES):
+    """
+    Import each module in turn and return (name, seconds, status) rows.
+    Costs are incremental: a module's shared dependencies are charged to
+    whichever module pulled them in first. For a full tree use
+    python -X importtime update_html.py.
+    """
+    rows = []
+    for name in modules:
+        already_loaded = name in sys.modules
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            status = "already loaded" if already_loaded else "ok"
+        except ImportError:
+            status = "missing"
+        rows.append((name, time.perf_counter() - start, status))
+    return rows
+
+
+def print_import_cost_report(modules=HEAVY_MODULES):
+    rows = import_cost_report(modules)
+    print(f"{'Module':<12} {'Import (ms)':>12}  Status")
+    for name, seconds, status in rows:
+        print(f"{name:<12} {seconds * 1000:>12.1f}  {status}")
+    print(f"{'total':<12} {sum(r[1] for r in rows) * 1000:>12.1f}")
+
+
+class RunReport:
+    """
+    Per-run instrumentation: wall-clock time per stage, counters such as
+    bytes downloaded and rows parsed, and the process's peak memory.
+    One record per run is appended to the run log as a JSON line.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def note(self, name, value):
+        self.info[name] = value
+
+    def record(self):
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_s": round(time.perf_counter() - self.start, 6),
+            "stages_s": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "peak_rss_kb": peak_rss_kb(),
+            **self.info,
+        }
+
+    def write(self, log_file):
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.record(), sort_keys=True) + "\n")
+
+    def print_summary(self):
+        record = self.record()
+        print(f"{'Stage':<16} {'Time (ms)':>10}")
+        for name, seconds in record["stages_s"].items():
+            print(f"{name:<16} {seconds * 1000:>10.1f}")
+        print(f"{'total':<16} {record['total_s'] * 1000:>10.1f}")
+        for name, value in sorted(record["counters"].items()):
+            print(f"{name:<16} {value:>10}")
+        if record["peak_rss_kb"] is not None:
+            print(f"{'peak RSS (MB)':<16} {record['peak_rss_kb'] / 1024:>10.1f}")
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KiB, or None where the
+    resource module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+# A context variable rather than a global, so concurrent asyncio tasks
+# (and the worker threads asyncio.to_thread runs for them, which inherit
+# the task's context) each record into their own report
+_run_report = ContextVar("run_report", default=RunReport())
+
+
+def run_report():
+    """
+    Return the RunReport of the current run.
+    """
+    return _run_report.get()
+
+
+def start_run_report():
+    """
+    Begin a new RunReport (main does this once, daemon mode once per cycle,
+    async_pipeline once per report task).
+    """
+    report = RunReport()
+    _run_report.set(report)
+    return report
+
 
 def next_quarter_hour(now):
     """
     Returns a new datetime rounded up to the next quarter hour: xx:00, xx:15, xx:30, xx:45.
-    For display only, so the user sees when the next scheduled run might be.
+    Used for display, and by daemon mode to schedule its wake-ups.
     """
     quarter = now.minute // 15
-    if now.minute % 15 == 0 and now.second == 0:
+    if now.minute % 15 == 0 and now.second == 0 and now.microsecond == 0:
         next_quarter = quarter
     else:
         next_quarter = quarter + 1
 
-    new_minute = next_quarter * 15
-    new_hour = now.hour
-    new_day = now.day
-
-    if new_minute == 60:
-        new_minute = 0
-        new_hour += 1
-        if new_hour == 24:
-            new_hour = 0
-            new_day += 1
-
-    return now.replace(
-        hour=new_hour,
-        minute=new_minute,
-        second=0,
-        microsecond=0,
-        day=new_day
-    )
+    # timedelta handles the hour/day/month rollover
+    return now.replace(minute=0, second=0, microsecond=0) + timedelta(minutes=next_quarter * 15)
+
+
+# Overridable so the pipeline can run against a local stand-in server,
+# see benchmarks/fake_ote_server.py
+BASE_URL = os.environ.get("OTE_BASE_URL", "https://www.ote-cr.cz").rstrip("/")
+LANDING_PATH = "/cs/kratkodobe-trhy/elektrina/vnitrodenni-trh"
+REQUEST_TIMEOUT = 10
 
 
-def fetch_and_process_data():
+class FetchClient:
     """
-    Fetch the OTE website Excel file, parse it into a DataFrame,
-    clean columns, etc.
+    Pooled keep-alive HTTP session for talking to the OTE website.
+    One instance is shared by the landing-page scrape, the Excel download
+    and every retry, so we pay the TCP+TLS handshake once per process.
     """
-    try:
-        url = "https://www.ote-cr.cz/cs/kratkodobe-trhy/elektrina/vnitrodenni-trh"
-        response = requests.get(url, timeout=10)
+
+    def __init__(self, base_url=BASE_URL, pool_size=4, timeout=REQUEST_TIMEOUT):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def url_for(self, path_or_url):
+        if path_or_url.startswith(("http://", "https://")):
+            return path_or_url
+        return self.base_url + path_or_url
+
+    def get(self, path_or_url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.get(self.url_for(path_or_url), **kwargs)
         response.raise_for_status()
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+
+
+def get_client(base_url=None):
+    """
+    Return the module-level FetchClient, creating it on first use or when
+    a different base_url is asked for.
+    """
+    global _client
+    base_url = (base_url or BASE_URL).rstrip("/")
+    if _client is None or _client.base_url != base_url:
+        if _client is not None:
+            _client.close()
+        _client = FetchClient(base_url=base_url)
+    return _client
+
+
+CACHE_FILE = "ote_cache.json"
+
+
+class FetchError(Exception):
+    """
+    Raised when the OTE report could not be downloaded or parsed.
+    """
+
+
+class ReportNotModified(Exception):
+    """
+    Raised when the OTE workbook is the same one we processed last run,
+    either because the server answered 304 or the content hash matched.
+    """
+
+
+def load_cache(cache_file=CACHE_FILE):
+    """
+    Load the on-disk validator cache. A missing or corrupt file is treated
+    as an empty cache, so the next run simply does a full download.
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_cache(cache, cache_file=CACHE_FILE):
+    """
+    Write the validator cache via a temp file + rename so an interrupted run
+    never leaves a half-written JSON file behind.
+    """
+    write_atomic(cache_file, json.dumps(cache, indent=2, sort_keys=True))
+
+
+def conditional_headers(cached, url):
+    """
+    Build If-None-Match / If-Modified-Since headers from the cached
+    validators, but only if they were recorded for the same URL.
+    """
+    headers = {}
+    if not cached or cached.get("url") != url:
+        return headers
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+class ReportLinkScanner(HTMLParser):
+    """
+    Streaming scan for the first <a href> inside
+    <p class="report_attachment_links">. Unlike a full soup, nothing is kept
+    except the href, and feeding can stop as soon as it is found.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_container = False
+        self.found_container = False
+        self.href = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.href is not None:
+            return
+        attrs = dict(attrs)
+        if tag == "p" and "report_attachment_links" in (attrs.get("class") or "").split():
+            self.in_container = True
+            self.found_container = True
+        elif tag == "a" and self.in_container and attrs.get("href"):
+            self.href = attrs["href"]
+
+    def handle_endtag(self, tag):
+        if tag == "p":
+            self.in_container = False
+
+
+def scrape_report_href(client, chunk_size=16384):
+    """
+    Stream the landing page and return the report download href,
+    stopping the download as soon as the link has been seen.
+    """
+    scanner = ReportLinkScanner()
+    report = run_report()
+    with report.stage("landing_page"), client.get(LANDING_PATH, stream=True) as response:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            report.count("bytes_downloaded", len(chunk))
+            scanner.feed(decoder.decode(chunk))
+            if scanner.href is not None:
+                break
+
+    if not scanner.found_container:
+        raise ValueError("Failed to find the report attachment container.")
+    if scanner.href is None:
+        raise ValueError("Failed to find the download link.")
+    return scanner.href
+
+
+# Ways a delivery date may be spelled inside an OTE attachment URL,
+# e.g. .../2025/month02/day01/IM_15MIN_01_02_2025_CZ.xlsx
+HREF_DATE_FORMATS = ("%d_%m_%Y", "%d.%m.%Y", "%Y-%m-%d", "%Y%m%d", "month%m", "day%d", "/%Y/")
+
+
+def href_day(href):
+    """
+    Return the delivery date spelled as DD_MM_YYYY in an attachment URL,
+    or None if the URL carries no such date.
+    """
+    match = re.search(r"(\d{2})_(\d{2})_(\d{4})", href or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def predict_report_href(cached_link, day, base_url=None):
+    """
+    Derive the report URL for `day` from the last known link by swapping
+    every spelling of its date. Returns None if there is nothing to go on,
+    or if the link was recorded against a site other than base_url.
+    """
+    if not cached_link or not cached_link.get("href") or not cached_link.get("day"):
+        return None
+
+    href = cached_link["href"]
+    if base_url and href.startswith(("http://", "https://")) and not href.startswith(base_url + "/"):
+        return None
+    try:
+        last_day = date.fromisoformat(cached_link["day"])
+    except ValueError:
+        return None
+    if last_day == day:
+        return href
+
+    predicted = href
+    for fmt in HREF_DATE_FORMATS:
+        predicted = predicted.replace(last_day.strftime(fmt), day.strftime(fmt))
+    return predicted if predicted != href else None
+
+
+INTERVAL_COL = "Časový interval"
+NUMERIC_COLS = [
+    "Zobchodované množství(MWh)",
+    "Zobchodované množství - nákup(MWh)",
+    "Zobchodované množství - prodej(MWh)",
+    "Vážený průměr cen (EUR/MWh)",
+    "Minimální cena(EUR/MWh)",
+    "Maximální cena(EUR/MWh)",
+    "Poslední cena(EUR/MWh)",
+]
+REQUIRED_COLS = [INTERVAL_COL] + NUMERIC_COLS
+# Short field names, as used on the page (ZM, ZMN, ZMp, VP, MinC, MaxC, PC)
+NUMERIC_KEYS = ["zm", "zmn", "zmp", "vp", "minc", "maxc", "pc"]
+
+# Row 6 (index 5) of the OTE workbook holds the column headers
+HEADER_ROW = 5
+# The streaming reader stops after this many consecutive blank rows
+MAX_TRAILING_BLANK_ROWS = 20
+
+EXCEL_BACKEND = os.environ.get("OTE_EXCEL_BACKEND", "auto")
+
+
+def clean_column_name(name):
+    """
+    Normalise a header cell the same way for every backend:
+    strip, drop embedded newlines and collapse runs of spaces.
+    """
+    if name is None:
+        return ""
+    return re.sub(" +", " ", str(name).strip().replace("\n", ""))
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        container = soup.find("p", class_="report_attachment_links")
-        if not container:
-            raise ValueError("Failed to find the report attachment container.")
 
-        link_tag = container.find("a")
-        if not link_tag or not link_tag.get("href"):
-            raise ValueError("Failed to find the download link.")
+def to_float(value):
+    """
+    Convert a workbook cell to float, returning NaN for blanks and text.
+    """
+    if value is None:
+        return float("nan")
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return float("nan")
+
 
-        file_href = link_tag["href"]
-        file_link = "https://www.ote-cr.cz" + file_href
-        file_response = requests.get(file_link, timeout=10)
-        file_response.raise_for_status()
+def check_required_columns(df):
+    for c in REQUIRED_COLS:
+        if c not in df.columns:
+            raise ValueError(f"Missing column '{c}' in DataFrame.")
+
+
+def read_report_pandas(content):
+    """
+    Original ingestion path: load the whole sheet with pd.read_excel,
+    promote the header row and slice off the preamble. Works for both
+    .xlsx (openpyxl) and legacy .xls (xlrd) workbooks.
+    """
+    import pandas as pd
 
-        excel_file = BytesIO(file_response.content)
-        df = pd.read_excel(excel_file, header=None)
-        if df.empty:
+    df = pd.read_excel(BytesIO(content), header=None)
+    if df.empty:
+        raise ValueError("Downloaded file is empty.")
+
+    df.columns = [clean_column_name(c) for c in df.iloc[HEADER_ROW]]
+    df = df[HEADER_ROW + 1:].reset_index(drop=True)
+
+    # Drop rows that are fully empty
+    df = df.dropna(how="all").reset_index(drop=True)
+    check_required_columns(df)
+
+    df[INTERVAL_COL] = df[INTERVAL_COL].astype(str).str.strip()
+    for c in NUMERIC_COLS:
+        df[c] = df[c].map(to_float).astype("float64")
+    return df
+
+
+def read_report_openpyxl(content):
+    """
+    Streaming ingestion path for .xlsx workbooks. Rows are read in
+    openpyxl's read-only mode, only the required columns are kept, the
+    numeric fields go straight into float64 arrays, and reading stops
+    once the data rows are followed by a run of blank rows.
+    """
+    import numpy as np
+    import openpyxl
+    import pandas as pd
+
+    wb = openpyxl.load_workbook(BytesIO(content), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = None
+        for i, values in enumerate(rows):
+            if i == HEADER_ROW:
+                header = [clean_column_name(c) for c in values]
+                break
+        if header is None:
             raise ValueError("Downloaded file is empty.")
 
-        # Use row 6 (index 5) as headers
-        df.columns = df.iloc[5]
-        df = df[6:].reset_index(drop=True)
-
-        # Clean column names
-        df.columns = (
-            df.columns
-            .str.strip()
-            .str.replace("\n", "", regex=True)
-            .str.replace(" +", " ", regex=True)
-        )
-
-        # Drop rows that are fully empty
-        df = df.dropna(how="all")
-
-        required_cols = [
-            "Časový interval",
-            "Zobchodované množství(MWh)",
-            "Zobchodované množství - nákup(MWh)",
-            "Zobchodované množství - prodej(MWh)",
-            "Vážený průměr cen (EUR/MWh)",
-            "Minimální cena(EUR/MWh)",
-            "Maximální cena(EUR/MWh)",
-            "Poslední cena(EUR/MWh)",
-        ]
-        for c in required_cols:
-            if c not in df.columns:
+        for c in REQUIRED_COLS:
+            if c not in header:
                 raise ValueError(f"Missing column '{c}' in DataFrame.")
+        interval_pos = header.index(INTERVAL_COL)
+        numeric_pos = [header.index(c) for c in NUMERIC_COLS]
+        width = len(header)
+
+        intervals = []
+        numeric = [[] for _ in NUMERIC_COLS]
+        blank_run = 0
+        for values in rows:
+            values = tuple(values[:width]) + (None,) * (width - len(values))
+            if all(v is None or (isinstance(v, str) and not v.strip()) for v in values):
+                blank_run += 1
+                if blank_run >= MAX_TRAILING_BLANK_ROWS:
+                    break
+                continue
+            blank_run = 0
+
+            interval = values[interval_pos]
+            intervals.append("nan" if interval is None else str(interval).strip())
+            for column, pos in zip(numeric, numeric_pos):
+                column.append(to_float(values[pos]))
+    finally:
+        wb.close()
+
+    if not intervals:
+        raise ValueError("Downloaded file is empty.")
+
+    data = {INTERVAL_COL: intervals}
+    for c, column in zip(NUMERIC_COLS, numeric):
+        data[c] = np.array(column, dtype="float64")
+    return pd.DataFrame(data, columns=REQUIRED_COLS)
+
+
+EXCEL_READERS = {
+    "pandas": read_report_pandas,
+    "openpyxl": read_report_openpyxl,
+}
+
+
+def _read_report(content, backend):
+    backend = backend or EXCEL_BACKEND
+    if backend != "auto":
+        if backend not in EXCEL_READERS:
+            raise ValueError(f"Unknown Excel backend '{backend}'.")
+        return EXCEL_READERS[backend](content)
+
+    if content[:2] == b"PK":
+        try:
+            return read_report_openpyxl(content)
+        except Exception as e:
+            print(f"Fast Excel reader failed ({e}); falling back to pandas.")
+    return read_report_pandas(content)
 
-        # Convert the interval column to string and strip
-        df["Časový interval"] = df["Časový interval"].astype(str).str.strip()
+
+def read_report(content, backend=None):
+    """
+    Parse the raw workbook bytes into a cleaned DataFrame with an
+    "is_empty" column.
+
+    backend is one of EXCEL_READERS or "auto" (the default, overridable via
+    OTE_EXCEL_BACKEND). "auto" streams .xlsx files with openpyxl and falls
+    back to pandas for legacy .xls files or if the fast reader fails.
+    """
+    return mark_empty_rows(_read_report(content, backend))
+
+
+def fetch_and_process_data(client=None, cache_file=CACHE_FILE, use_cache=True, backend=None):
+    """
+    Fetch the OTE website Excel file, parse it into a DataFrame,
+    clean columns, etc.
+
+    With use_cache, the workbook is requested conditionally using the
+    validators stored in cache_file. If OTE answers 304, or the body hashes
+    to the same digest as last time, ReportNotModified is raised before any
+    parsing happens.
+
+    The download URL is predicted from the last known link and today's date;
+    the landing page is only scraped when there is no prediction or the
+    predicted URL returns 404.
+
+    backend selects the Excel reader, see read_report. The delivery day,
+    source URL and content hash are recorded in df.attrs.
+    """
+    import requests
+
+    client = client or get_client()
+    report = run_report()
+    cache = load_cache(cache_file) if use_cache else {}
+    cached = cache.get("report")
+    today = datetime.now(prague_tz()).date()
+    try:
+        file_link = None
+        file_response = None
+
+        predicted_href = predict_report_href(cache.get("report_link"), today, client.base_url)
+        if predicted_href:
+            file_link = client.url_for(predicted_href)
+            try:
+                with report.stage("download"):
+                    file_response = client.get(
+                        file_link, headers=conditional_headers(cached, file_link)
+                    )
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                print(f"Predicted report URL {file_link} not found; scraping landing page.")
+                file_response = None
+
+        if file_response is None:
+            file_link = client.url_for(scrape_report_href(client))
+            with report.stage("download"):
+                file_response = client.get(
+                    file_link, headers=conditional_headers(cached, file_link)
+                )
+
+        report.note("http_status", file_response.status_code)
+        report.count("bytes_downloaded", len(file_response.content))
+        if file_response.status_code == 304:
+            raise ReportNotModified(f"Server returned 304 for {file_link}.")
+
+        content_hash = hashlib.sha256(file_response.content).hexdigest()
+        if cached and cached.get("sha256") == content_hash:
+            raise ReportNotModified("Downloaded workbook is identical to the last one.")
+
+        with report.stage("parse"):
+            df = read_report(file_response.content, backend)
+        report.count("rows_parsed", len(df))
+        link_day = href_day(file_link) or today
+        df.attrs["delivery_day"] = link_day.isoformat()
+        df.attrs["source_url"] = file_link
+        df.attrs["sha256"] = content_hash
+
+        # Only remember validators once the workbook parsed cleanly
+        if use_cache:
+            cache["report"] = {
+                "url": file_link,
+                "etag": file_response.headers.get("ETag"),
+                "last_modified": file_response.headers.get("Last-Modified"),
+                "sha256": content_hash,
+            }
+            cache["report_link"] = {"href": file_link, "day": link_day.isoformat()}
+            save_cache(cache, cache_file)
 
         return df
 
+    except ReportNotModified:
+        raise
     except Exception as e:
-        print(f"Error while fetching/processing data: {e}")
-        sys.exit(1)
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            report.note("http_status", e.response.status_code)
+        raise FetchError(f"Error while fetching/processing data: {e}") from e
 
 
-def row_is_empty(row):
+EMPTY_COL = "is_empty"
+
+
+def empty_mask(df):
     """
-    Check if all numeric columns are NaN or blank, meaning no real data.
+    Vectorised emptiness check: True for rows whose numeric columns are all
+    NaN or blank. Uses the precomputed "is_empty" column when present.
     """
-    num_cols = [
-        "Zobchodované množství(MWh)",
-        "Zobchodované množství - nákup(MWh)",
-        "Zobchodované množství - prodej(MWh)",
-        "Vážený průměr cen (EUR/MWh)",
-        "Minimální cena(EUR/MWh)",
-        "Maximální cena(EUR/MWh)",
-        "Poslední cena(EUR/MWh)",
-    ]
-    for c in num_cols:
-        val = row.get(c)
-        if pd.notna(val) and str(val).strip() != "":
-            return False
-    return True
+    import numpy as np
+
+    if is_snapshot(df):
+        return df.is_empty
+    if EMPTY_COL in df.columns:
+        return df[EMPTY_COL].to_numpy(dtype=bool)
+
+    mask = np.ones(len(df), dtype=bool)
+    for c in NUMERIC_COLS:
+        if c not in df.columns:
+            continue
+        col = df[c]
+        blank = col.isna().to_numpy()
+        if col.dtype == object:
+            blank |= col.astype(str).str.strip().eq("").to_numpy()
+        mask &= blank
+    return mask
+
 
+def mark_empty_rows(df):
+    """
+    Store the emptiness mask as the "is_empty" column, once per DataFrame.
+    """
+    df[EMPTY_COL] = empty_mask(df.drop(columns=EMPTY_COL, errors="ignore"))
+    return df
 
-def get_fallback_row(df, start_idx):
+
+def last_non_empty_positions(is_empty):
     """
-    Walk backward from start_idx until we find a non-empty row.
+    For every position i, the position of the last non-empty row at or
+    before i, or -1 if there is none.
     """
-    for i in range(start_idx, -1, -1):
-        row = df.iloc[i]
-        if not row_is_empty(row):
-            msg = (f"No new data available after interval {row['Časový interval']}. "
-                   f"Showing last known data from {row['Časový interval']}.")
-            return row, msg
+    import numpy as np
+
+    positions = np.where(is_empty, -1, np.arange(len(is_empty)))
+    return np.maximum.accumulate(positions) if len(positions) else positions
+
+
+def get_fallback_row(df, start_idx, index=None):
+    """
+    Find the last non-empty row at or before start_idx.
+    With an IntervalIndex this is a single lookup in its
+    last_non_empty array instead of a backward walk.
+    """
+    if index is not None:
+        last_non_empty = index.last_non_empty
+    else:
+        last_non_empty = last_non_empty_positions(empty_mask(df))
+
+    pos = int(last_non_empty[start_idx]) if len(last_non_empty) else -1
+    if pos >= 0:
+        row = df.iloc[pos]
+        msg = (f"No new data available after interval {row['Časový interval']}. "
+               f"Showing last known data from {row['Časový interval']}.")
+        return row, msg
 
     if len(df) > 0:
         return df.iloc[0], "No non-empty row found; showing the earliest row."
@@ -143,224 +703,1094 @@ def get_fallback_row(df, start_idx):
         return None, "No data in DataFrame at all."
 
 
-def get_current_time_block(df):
+MINUTES_PER_DAY = 24 * 60
+
+# Outcomes of an IntervalIndex lookup
+MATCH_EXACT = 0          # an interval covers the instant
+MATCH_LAST_BEFORE = 1    # no cover; the latest interval starting earlier
+MATCH_FIRST = 2          # every interval starts later; the earliest one
+MATCH_NONE = 3           # no parseable intervals at all
+
+
+def local_midnight(day):
     """
-    Find the row whose time interval covers the current CET time.
-    If none, pick the last interval that started before now.
-    If that row is empty, fallback to older data.
+    Start of a delivery day as an aware Prague datetime.
     """
-    cet_tz = pytz.timezone("Europe/Prague")
-    now = datetime.now(cet_tz).time()
+    return prague_tz().localize(datetime.combine(day, datetime.min.time()))
 
-    valid_rows = []
-    for idx, row in df.iterrows():
-        interval_str = row["Časový interval"]
 
-        # Skip repeated headers or invalid lines
-        if "Perioda" in interval_str or "Časový interval" in interval_str:
-            continue
+def day_slots(day):
+    """
+    Quarter-hour intervals in a delivery day: 96, or 92 / 100 on the days
+    the clocks go forward / back.
+    """
+    start = local_midnight(day)
+    end = local_midnight(day + timedelta(days=1))
+    return int((end - start).total_seconds()) // 900
 
-        try:
-            start_str, end_str = interval_str.split("-")
-            st = datetime.strptime(start_str.strip(), "%H:%M").time()
-            et = datetime.strptime(end_str.strip(), "%H:%M").time()
-        except ValueError:
-            # skip un-parseable intervals
-            continue
 
-        crosses_midnight = (st > et)
-        valid_rows.append((idx, st, et, crosses_midnight))
+def local_instants(day, minute):
+    """
+    UTC epoch seconds of every instant at which Prague clocks show `minute`
+    on `day`, earliest first: one normally, two in the repeated hour when
+    the clocks go back. A time skipped when the clocks go forward maps to
+    the instant it would have had without the change.
+    """
+    import pytz
 
-    if not valid_rows:
-        if len(df) > 0:
-            return df.iloc[-1], "No parseable intervals found; showing last row by default."
-        else:
-            return None, "No data at all."
+    tz = prague_tz()
+    naive = datetime.combine(day, datetime.min.time()) + timedelta(minutes=int(minute))
+    try:
+        return [int(tz.localize(naive, is_dst=None).timestamp())]
+    except pytz.AmbiguousTimeError:
+        return [int(tz.localize(naive, is_dst=True).timestamp()), int(tz.localize(naive, is_dst=False).timestamp())]
+    except pytz.NonExistentTimeError:
+        return [int(tz.localize(naive, is_dst=False).timestamp())]
 
-    matching_idx = None
-    # We'll store (idx, start_time) so we can compare time objects
-    last_before = None
 
-    for (idx, st, et, crosses_midnight) in valid_rows:
-        if crosses_midnight:
-            # e.g., 23:45-00:00
-            if now >= st or now < et:
-                matching_idx = idx
-                break
-        else:
-            if st <= now < et:
-                matching_idx = idx
-                break
+def interval_instants(day, starts, ends):
+    """
+    Absolute UTC start/end (epoch seconds) of intervals given as local
+    start/end minutes, in row order, for a sheet whose first interval is on
+    delivery day `day`.
 
-        # Track the last interval that started before now
-        if st <= now:
-            if last_before is None:
-                last_before = (idx, st)
-            else:
-                if st > last_before[1]:
-                    last_before = (idx, st)
-
-    if matching_idx is not None:
-        row = df.iloc[matching_idx]
-        if row_is_empty(row):
-            return get_fallback_row(df, matching_idx)
-        else:
-            return row, ""
+    Each interval takes the earliest instant after the previous interval's
+    start whose Prague wall clock matches its label. That resolves the
+    repeated 02:00-03:00 hour of a 100-slot day by order (first pass in
+    CEST, second in CET) and rolls over to the next day when a sheet holds
+    several days. The end is the start plus the labelled length.
+
+    A sheet too short to hold two days is a single day, so it must not roll
+    over: if it does (a label repeated where the day has no repeated hour,
+    e.g. a 100-slot sheet for a 96-slot day), a warning is printed and every
+    row is mapped onto `day` instead (see single_day_instants).
+    """
+    import numpy as np
+
+    n = len(starts)
+    start_ts = np.empty(n, dtype=np.int64)
+    end_ts = np.empty(n, dtype=np.int64)
+    previous = None
+    current_day = day
+    for i in range(n):
+        start = None
+        while start is None:
+            start = next((t for t in local_instants(current_day, starts[i]) if previous is None or t > previous), None)
+            if start is None:
+                current_day += timedelta(days=1)
+        length = (int(ends[i]) - int(starts[i])) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        start_ts[i] = start
+        end_ts[i] = start + length * 60
+        previous = start
+
+    slots = day_slots(day)
+    if current_day != day and n < slots + day_slots(day + timedelta(days=1)):
+        print(f"Warning: {n} interval(s) for {day} do not fit its {slots} slots; "
+              f"mapping them all onto {day}.")
+        return single_day_instants(day, starts, ends)
+    return start_ts, end_ts
+
+
+def single_day_instants(day, starts, ends):
+    """
+    Like interval_instants, but every row is taken to be on `day`: the k-th
+    row with a label gets the k-th instant Prague clocks show it (the last
+    one if there are fewer), so the result never leaves the day. Starts
+    never go back (lookup binary-searches them), so a row whose label was
+    used up earlier is clamped to the previous start, with no time of its
+    own if it ends before that.
+    """
+    import numpy as np
+
+    n = len(starts)
+    start_ts = np.empty(n, dtype=np.int64)
+    end_ts = np.empty(n, dtype=np.int64)
+    seen = {}
+    for i in range(n):
+        candidates = local_instants(day, starts[i])
+        k = seen.get(int(starts[i]), 0)
+        seen[int(starts[i])] = k + 1
+        length = (int(ends[i]) - int(starts[i])) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        start_ts[i] = candidates[min(k, len(candidates) - 1)]
+        end_ts[i] = start_ts[i] + length * 60
+    start_ts = np.maximum.accumulate(start_ts) if n else start_ts
+    return start_ts, np.maximum(end_ts, start_ts)
+
+
+class IntervalIndex:
+    """
+    Parsed form of the "Časový interval" column. Labels are parsed once into
+    minute-of-day start/end arrays; for a delivery day these become absolute
+    UTC instants (see interval_instants), so "which row covers this moment"
+    is a binary search that stays exact on 92, 96 and 100-slot days.
+
+    Repeated header lines ("Perioda", "Časový interval") and unparseable
+    labels are skipped, exactly like the old row-by-row loop.
+
+    If an emptiness mask is given, the index also keeps it together with
+    the last-non-empty-row array used for O(1) fallbacks.
+    """
+
+    def __init__(self, labels, is_empty=None):
+        import numpy as np
+        import pandas as pd
+
+        if is_empty is None:
+            is_empty = np.zeros(len(labels), dtype=bool)
+        self.is_empty = np.asarray(is_empty, dtype=bool)
+        self.last_non_empty = last_non_empty_positions(self.is_empty)
+
+        labels = pd.Series(labels, dtype="object").astype(str)
+        parts = labels.str.extract(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+        parts = parts.apply(pd.to_numeric).to_numpy(dtype="float64")
+        valid = ~np.isnan(parts).any(axis=1)
+        valid &= (parts[:, 0] < 24) & (parts[:, 1] < 60) & (parts[:, 2] < 24) & (parts[:, 3] < 60)
+
+        parts = parts[valid].astype(np.int64)
+        self._set_intervals(np.flatnonzero(valid), parts[:, 0] * 60 + parts[:, 1], parts[:, 2] * 60 + parts[:, 3])
+
+    @classmethod
+    def from_minutes(cls, starts, ends, is_empty=None):
+        """
+        Index already parsed intervals, one per row (as kept by a
+        DaySnapshot), without going through the label strings again.
+        """
+        import numpy as np
+
+        index = cls.__new__(cls)
+        n = len(starts)
+        index.is_empty = np.zeros(n, dtype=bool) if is_empty is None else np.asarray(is_empty, dtype=bool)
+        index.last_non_empty = last_non_empty_positions(index.is_empty)
+        index._set_intervals(np.arange(n), np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64))
+        return index
+
+    def _set_intervals(self, positions, starts, ends):
+        self.positions = positions
+        self.starts = starts
+        self.ends = ends
+        self._instants = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def instants(self, day):
+        """
+        (start, end) UTC epoch-second arrays of the indexed intervals on
+        delivery day `day`, computed once per day.
+        """
+        if day not in self._instants:
+            self._instants[day] = interval_instants(day, self.starts, self.ends)
+        return self._instants[day]
+
+    def lookup(self, now, day=None):
+        """
+        Return (kind, position) for a moment, where position is the
+        DataFrame row position (or None when kind is MATCH_NONE).
+
+        now is an aware datetime (naive values are taken as Prague time);
+        day is the sheet's delivery day and defaults to now's local date.
+        """
+        import numpy as np
+
+        if len(self.positions) == 0:
+            return MATCH_NONE, None
+        if now.tzinfo is None:
+            now = prague_tz().localize(now)
+        if day is None:
+            day = now.astimezone(prague_tz()).date()
+
+        starts, ends = self.instants(day)
+        t = now.timestamp()
+        i = int(np.searchsorted(starts, t, side="right")) - 1
+        if i < 0:
+            return MATCH_FIRST, int(self.positions[0])
+        if t < ends[i]:
+            return MATCH_EXACT, int(self.positions[i])
+        return MATCH_LAST_BEFORE, int(self.positions[i])
+
+
+def is_snapshot(data):
+    """
+    True for a day_snapshot.DaySnapshot, which selection and rendering
+    accept in place of the fetched DataFrame.
+    """
+    return hasattr(data, "interval_index")
+
+
+def build_interval_index(df):
+    if is_snapshot(df):
+        return df.interval_index()
+    return IntervalIndex(df["Časový interval"].to_numpy(), empty_mask(df))
+
+
+def delivery_day_of(df):
+    """
+    The delivery day recorded in df.attrs as a date, or None.
+    """
+    try:
+        return date.fromisoformat(df.attrs.get("delivery_day") or "")
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def add_instant_columns(table, index, day):
+    """
+    Add start_utc / end_utc (UTC timestamps, NaT when the delivery day is
+    unknown) for the intervals of `index` to an interval table.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if day is None:
+        missing = np.full(len(table), np.datetime64("NaT"), dtype="datetime64[s]")
+        starts = ends = missing
     else:
-        # No exact match
-        if last_before is not None:
-            row = df.iloc[last_before[0]]
-            if row_is_empty(row):
-                return get_fallback_row(df, last_before[0])
-            else:
-                msg = (f"No exact match for current time. "
-                       f"Showing last known data from {row['Časový interval']}.")
-                return row, msg
-        else:
-            # All intervals start after now
-            first_idx = valid_rows[0][0]
-            row = df.iloc[first_idx]
-            if row_is_empty(row):
-                return get_fallback_row(df, first_idx)
-            msg = (f"All intervals start after {now.strftime('%H:%M')}. "
-                   f"Showing earliest interval in data: {row['Časový interval']}.")
-            return row, msg
+        starts, ends = (a.astype("datetime64[s]") for a in index.instants(day))
+    table["start_utc"] = pd.DatetimeIndex(starts).tz_localize("UTC").as_unit("us")
+    table["end_utc"] = pd.DatetimeIndex(ends).tz_localize("UTC").as_unit("us")
+    return table
 
 
-def generate_html(row, fallback_message, output_file="index.html"):
+def interval_table(df, index=None, delivery_day=None):
     """
-    Create the index.html with the same styling as before.
+    One row per parseable interval with short typed columns: slot (0-based
+    ordinal within the day), interval, start/end minute, start/end UTC
+    instant, zm..pc, is_empty. Shared by the feed export and the archive.
+
+    delivery_day (a date) defaults to the one in df.attrs.
     """
-    cet_tz = pytz.timezone("Europe/Prague")
-    now_cet = datetime.now(cet_tz)
-    now_str = now_cet.strftime("%Y-%m-%d %H:%M:%S")
+    import numpy as np
+    import pandas as pd
 
-    # Display next scheduled update as the next quarter hour (purely for UI)
-    next_run_cet = next_quarter_hour(now_cet)
-    next_run_str = next_run_cet.strftime("%Y-%m-%d %H:%M:%S")
+    if is_snapshot(df):
+        return df.table(delivery_day)
+    if index is None:
+        index = build_interval_index(df)
+    pos = index.positions
 
-    if row is None:
-        # No data scenario
-        html_content = f"""<!DOCTYPE html>
+    table = pd.DataFrame({
+        "slot": np.arange(len(pos), dtype="int16"),
+        "interval": df[INTERVAL_COL].to_numpy(dtype=object)[pos].astype(str),
+        "start_minute": index.starts.astype("int16"),
+        "end_minute": index.ends.astype("int16"),
+    })
+    add_instant_columns(table, index, delivery_day or delivery_day_of(df))
+    for col, key in zip(NUMERIC_COLS, NUMERIC_KEYS):
+        table[key] = df[col].to_numpy(dtype="float64")[pos]
+    table["is_empty"] = index.is_empty[pos]
+    return table
+
+
+def minute_of_day(now):
+    """
+    Minute of the day in Prague local time for a datetime or time.
+    Aware datetimes are converted; naive values are taken as local time.
+    """
+    if isinstance(now, datetime):
+        if now.tzinfo is not None:
+            now = now.astimezone(prague_tz())
+        now = now.time()
+    return now.hour * 60 + now.minute
+
+
+def get_current_time_block(df, now=None, index=None):
+    """
+    Find the row whose time interval covers the current CET time.
+    If none, pick the last interval that started before now.
+    If that row is empty, fallback to older data.
+
+    now defaults to the current Prague time. index is an optional
+    IntervalIndex from build_interval_index(df); pass it in when selecting
+    many times from the same DataFrame.
+
+    Intervals are compared as absolute instants on the delivery day in
+    df.attrs (or now's date), so the repeated hour of a 100-slot day and
+    the missing one of a 92-slot day resolve exactly.
+    """
+    if df is None:
+        return None, "No data at all."
+
+    if now is None:
+        now = datetime.now(prague_tz())
+    elif not isinstance(now, datetime):
+        # A bare time of day is taken on the delivery day
+        now = datetime.combine(delivery_day_of(df) or datetime.now(prague_tz()).date(), now)
+    if index is None:
+        index = build_interval_index(df)
+
+    if len(index) == 0:
+        if len(df) > 0:
+            return df.iloc[-1], "No parseable intervals found; showing last row by default."
+        else:
+            return None, "No data at all."
+
+    minute = minute_of_day(now)
+    kind, pos = index.lookup(now, delivery_day_of(df))
+    if index.is_empty[pos]:
+        return get_fallback_row(df, pos, index)
+    row = df.iloc[pos]
+
+    if kind == MATCH_EXACT:
+        return row, ""
+    elif kind == MATCH_LAST_BEFORE:
+        msg = (f"No exact match for current time. "
+               f"Showing last known data from {row['Časový interval']}.")
+        return row, msg
+    else:
+        # All intervals start after now
+        msg = (f"All intervals start after {minute // 60:02d}:{minute % 60:02d}. "
+               f"Showing earliest interval in data: {row['Časový interval']}.")
+        return row, msg
+
+
+NO_DATA_TEMPLATE = Template("""<!DOCTYPE html>
 <html lang="cs">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Electricity Market Data</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 20px;
             background-color: #f9f9f9;
-        }}
-        .warning {{
+        }
+        .warning {
             color: red;
             font-weight: bold;
-        }}
+        }
     </style>
 </head>
 <body>
     <h1>Electricity Market Data Viewer</h1>
-    <p><strong>Last Updated (CET):</strong> {now_str}</p>
-    <p class="warning">{fallback_message}</p>
-    <p><em>Next scheduled update (approx.): {next_run_str} (CET)</em></p>
-    <!-- Script run at {datetime.utcnow()} UTC -->
+    <p><strong>Last Updated (CET):</strong> $now_str</p>
+    <p class="warning">$fallback_message</p>
+    <p><em>Next scheduled update (approx.): $next_run_str (CET)</em></p>
+    <!-- data-digest: $digest -->
+    <!-- Script run at $run_utc UTC -->
 </body>
-</html>"""
-    else:
-        interval = row.get("Časový interval", "NA")
-        zm = row.get("Zobchodované množství(MWh)", "NA")
-        zmn = row.get("Zobchodované množství - nákup(MWh)", "NA")
-        zmp = row.get("Zobchodované množství - prodej(MWh)", "NA")
-        vp = row.get("Vážený průměr cen (EUR/MWh)", "NA")
-        minc = row.get("Minimální cena(EUR/MWh)", "NA")
-        maxc = row.get("Maximální cena(EUR/MWh)", "NA")
-        pc = row.get("Poslední cena(EUR/MWh)", "NA")
-
-        html_content = f"""<!DOCTYPE html>
+</html>""")
+
+DATA_TEMPLATE = Template("""<!DOCTYPE html>
 <html lang="cs">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Electricity Market Data</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             margin: 20px;
             background-color: #f9f9f9;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #333;
-        }}
-        p {{
+        }
+        p {
             font-size: 16px;
             color: #555;
-        }}
-        .warning {{
+        }
+        .warning {
             color: red;
             font-weight: bold;
-        }}
+        }
+        .chart {
+            max-width: 100%;
+            height: auto;
+        }
     </style>
 </head>
 <body>
     <h1>Electricity Market Data Viewer</h1>
-    <p><strong>Last Updated (CET):</strong> {now_str}</p>
-    <p>Ci: {interval} 
-       ZM{zm} 
-       ZMN{zmn} 
-       ZMp{zmp} 
-       VP{vp} 
-       MinC{minc} 
-       MaxC{maxc} 
-       PC{pc}
+    <p><strong>Last Updated (CET):</strong> $now_str</p>
+    <p>Ci: $interval 
+       ZM$zm 
+       ZMN$zmn 
+       ZMp$zmp 
+       VP$vp 
+       MinC$minc 
+       MaxC$maxc 
+       PC$pc
     </p>
-    <p><em>Next scheduled update (approx.): {next_run_str} (CET)</em></p>
-    {"<p class='warning'>" + fallback_message + "</p>" if fallback_message else ""}
-    <!-- Script run at {datetime.utcnow()} UTC -->
+    $sections
+    <p><em>Next scheduled update (approx.): $next_run_str (CET)</em></p>
+    $warning
+    <!-- data-digest: $digest -->
+    <!-- Script run at $run_utc UTC -->
 </body>
 </html>
-"""
+""")
+
+# Fields that change on every run and are left out of the data digest
+TIMESTAMP_FIELDS = ("now_str", "next_run_str", "run_utc", "digest")
+DIGEST_RE = re.compile(r"<!-- data-digest: ([0-9a-f]*) -->")
+
+
+def write_atomic(path, text):
+    """
+    Write text to path via a temp file + rename, so readers (and the Pages
+    deploy) never see a half-written file.
+    """
+    import tempfile
+
+    # A temp file of its own, so concurrent writers to the same path never
+    # share (and replace) each other's half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def page_state_file(key, state_dir):
+    """
+    The state file under state_dir of the page at path `key` (e.g.
+    "index.html" or "other/index.html"), one per page so that pages
+    rendered concurrently never write the same file.
+    """
+    name = os.path.normpath(key).replace(os.sep, "__").replace("/", "__")
+    return os.path.join(state_dir, name + ".json")
+
+
+def read_digest(output_file):
+    """
+    Return the data digest embedded in an existing page, or None.
+    """
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            match = DIGEST_RE.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def page_fields(row, fallback_message, sections=None):
+    """
+    Template fields that depend only on the data, not on the clock.
+    sections are extra HTML blocks shown under the current interval.
+    """
+    if row is None:
+        return NO_DATA_TEMPLATE, {"fallback_message": fallback_message}
+
+    fields = {"interval": row.get("Časový interval", "NA")}
+    for col, key in zip(NUMERIC_COLS, NUMERIC_KEYS):
+        fields[key] = row.get(col, "NA")
+    fields["sections"] = "\n    ".join(s for s in sections or [] if s)
+    fields["warning"] = "<p class='warning'>" + fallback_message + "</p>" if fallback_message else ""
+    return DATA_TEMPLATE, fields
+
+
+def generate_html(row, fallback_message, output_file="index.html", force=False, sections=None):
+    """
+    Create the index.html with the same styling as before.
+
+    The page embeds a digest of its body rendered without any timestamps.
+    If the existing file carries the same digest, the data has not changed
+    and the file is left alone (unless force is set), so the repository and
+    Pages deploy only change when the data does. Returns True if written.
+    sections are extra HTML blocks shown under the current interval.
+    """
+    template, fields = page_fields(row, fallback_message, sections)
+
+    digest_input = template.substitute(fields, **{k: "" for k in TIMESTAMP_FIELDS})
+    digest = hashlib.sha256(digest_input.encode("utf-8")).hexdigest()
+    if not force and read_digest(output_file) == digest:
+        print(f"HTML file '{output_file}' is up to date; not rewriting it.")
+        return False
+
+    cet_tz = prague_tz()
+    now_cet = datetime.now(cet_tz)
+
+    # Display next scheduled update as the next quarter hour (purely for UI)
+    next_run_cet = next_quarter_hour(now_cet)
+
+    html_content = template.substitute(
+        fields,
+        now_str=now_cet.strftime("%Y-%m-%d %H:%M:%S"),
+        next_run_str=next_run_cet.strftime("%Y-%m-%d %H:%M:%S"),
+        run_utc=datetime.now(timezone.utc).replace(tzinfo=None),
+        digest=digest,
+    )
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    write_atomic(output_file, html_content)
     print(f"HTML file '{output_file}' has been generated.")
+    return True
 
 
-def main():
+def archive_report(df, archive_dir):
+    """
+    Archive stage: append the fetched table to the Parquet history.
+    Failures are reported but never stop the page from being updated.
+    """
+    try:
+        import archive
+        with run_report().stage("archive"):
+            path = archive.archive_day(df, archive_dir=archive_dir)
+    except ImportError as e:
+        print(f"Archive skipped, missing dependency: {e}")
+        return
+    except Exception as e:
+        print(f"Error while archiving data: {e}")
+        return
+    if path:
+        print(f"Archived data to '{path}'.")
+    else:
+        print("Archive already up to date.")
+
+
+def store_report(df, db_file):
+    """
+    Store stage: upsert the fetched table into the SQLite store.
+    Like archiving, failures never stop the page from being updated.
+    """
+    try:
+        import store
+        with run_report().stage("store"), store.IntradayStore(db_file) as db:
+            written = db.upsert(df)
+    except Exception as e:
+        print(f"Error while storing data: {e}")
+        return
+    print(f"Stored {written} interval(s) in '{db_file}'.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update index.html with the latest OTE intraday data.")
+    parser.add_argument(
+        "--base-url",
+        default=BASE_URL,
+        help="OTE website base URL (default: $OTE_BASE_URL or the live site).",
+    )
+    parser.add_argument(
+        "--excel-backend",
+        choices=["auto"] + sorted(EXCEL_READERS),
+        default=None,
+        help="Excel reader to use (default: $OTE_EXCEL_BACKEND or 'auto').",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=os.path.join("data", "archive"),
+        help="Directory of the date-partitioned Parquet archive.",
+    )
+    parser.add_argument(
+        "--no-archive",
+        action="store_true",
+        help="Do not append fetched data to the archive.",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.path.join("data", "ote.sqlite"),
+        help="SQLite store for ad-hoc queries, see store.py ('' to disable).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=90.0,
+        help="Seconds to keep retrying while the data is stale (default: 90).",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        type=float,
+        default=5.0,
+        help="Initial retry delay in seconds; doubles on each retry, with jitter (default: 5).",
+    )
+    parser.add_argument(
+        "--retry-max-delay",
+        type=float,
+        default=30.0,
+        help="Upper bound for the retry delay in seconds (default: 30).",
+    )
+    parser.add_argument(
+        "--import-times",
+        action="store_true",
+        help="Print how long each heavy dependency takes to import, then exit.",
+    )
+    parser.add_argument(
+        "--run-log",
+        default=os.path.join("data", "run_log.jsonl"),
+        help="Append one JSON line per run with stage timings and counters ('' to disable).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Write an OpenMetrics text file (e.g. for the node-exporter textfile collector).",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print a stage timing summary at the end of the run.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run as a resident process that wakes after each quarter-hour publication.",
+    )
+    parser.add_argument(
+        "--publish-delay",
+        type=float,
+        default=5.0,
+        help="Daemon: minutes after each quarter hour when OTE usually publishes (default: 5).",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=15.0,
+        help="Daemon: initial seconds between polls while waiting for new data (default: 15).",
+    )
+    parser.add_argument(
+        "--poll-max-interval",
+        type=float,
+        default=120.0,
+        help="Daemon: upper bound for the polling backoff in seconds (default: 120).",
+    )
+    return parser.parse_args(argv)
+
+
+def freshness_marker(df):
+    """
+    What identifies the data in df for staleness checks: its delivery day,
+    the latest interval that carries data (its label and its end as UTC
+    epoch seconds, which tells the two passes of a repeated hour apart),
+    and the workbook content hash.
+    """
+    import numpy as np
+
+    index = build_interval_index(df)
+    last_non_empty = last_non_empty_positions(index.is_empty)
+    pos = int(last_non_empty[-1]) if len(last_non_empty) else -1
+    latest_end = None
+    day = delivery_day_of(df)
+    if pos >= 0 and day is not None:
+        i = int(np.searchsorted(index.positions, pos))
+        if i < len(index) and index.positions[i] == pos:
+            latest_end = int(index.instants(day)[1][i])
+    return {
+        "delivery_day": df.attrs.get("delivery_day"),
+        "latest_interval": str(df.iloc[pos]["Časový interval"]) if pos >= 0 else None,
+        "latest_end": latest_end,
+        "sha256": df.attrs.get("sha256"),
+    }
+
+
+def note_freshness(report, marker):
+    """
+    Record the data a run ended up with (or, when it got nothing new, the
+    data still on the page) so the staleness metric keeps counting.
+    """
+    if marker:
+        report.note("delivery_day", marker.get("delivery_day"))
+        report.note("latest_interval", marker.get("latest_interval"))
+        report.note("latest_end", marker.get("latest_end"))
+
+
+def is_fresh(marker, previous):
+    """
+    Data is fresh when the workbook changed and its latest non-empty
+    interval moved on since the previous marker. Without a previous
+    marker everything counts as fresh.
+    """
+    if not previous:
+        return True
+    if marker.get("sha256") and marker.get("sha256") == previous.get("sha256"):
+        return False
+    keys = ("delivery_day", "latest_interval", "latest_end")
+    return tuple(marker.get(k) for k in keys) != tuple(previous.get(k) for k in keys)
+
+
+def remember_freshness(marker, cache_file=CACHE_FILE):
+    cache = load_cache(cache_file)
+    cache["freshness"] = marker
+    save_cache(cache, cache_file)
+
+
+def jittered(delay):
+    """
+    Equal-jitter backoff: somewhere between half and all of delay, so
+    concurrent runs don't retry in lockstep.
+    """
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+FEED_JSON = "feed.json"
+FEED_CSV = "feed.csv"
+CURRENT_JSON = "current.json"
+
+
+def json_number(value):
+    """
+    Float for JSON output; NaN, blanks and text become null.
+    """
+    value = to_float(value)
+    return None if value != value else value
+
+
+def build_feed(df, row, fallback_message, index=None, extras=None):
+    """
+    Machine-readable twin of index.html: the current row, every interval
+    of the day as compact columns, and the fallback metadata. Contains no
+    timestamps, so an unchanged day serialises to identical bytes.
+    extras are added as further top-level keys (e.g. "aggregates").
+    """
+    table = interval_table(df, index) if df is not None else None
+    current = None
+    if row is not None:
+        current = {"interval": str(row.get("Časový interval", ""))}
+        for col, key in zip(NUMERIC_COLS, NUMERIC_KEYS):
+            current[key] = json_number(row.get(col))
+
+    intervals = {"interval": [] if table is None else table["interval"].tolist()}
+    for key in NUMERIC_KEYS:
+        intervals[key] = [] if table is None else [json_number(v) for v in table[key]]
+
+    feed = {
+        "delivery_day": df.attrs.get("delivery_day") if df is not None else None,
+        "current": current,
+        "fallback": {"active": bool(fallback_message), "message": fallback_message or ""},
+        "intervals": intervals,
+    }
+    feed.update(extras or {})
+    return feed
+
+
+def current_feed(feed):
+    """
+    The small part of a feed (see build_feed) for clients that poll for
+    the current interval: delivery day, current row and fallback only.
+    """
+    return {key: feed[key] for key in ("delivery_day", "current", "fallback")}
+
+
+def write_if_changed(path, text):
+    """
+    Atomically write text unless path already holds exactly that text.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    write_atomic(path, text)
+    return True
+
+
+def write_feed(df, row, fallback_message, output_dir=".", index=None, extras=None):
+    """
+    Write feed.json (see build_feed) and feed.csv, the full day with one
+    row per interval, next to index.html, plus current.json (see
+    current_feed) for clients that only need the current row.
+    """
+    feed = build_feed(df, row, fallback_message, index, extras)
+    json_path = os.path.join(output_dir, FEED_JSON)
+    csv_path = os.path.join(output_dir, FEED_CSV)
+    current_path = os.path.join(output_dir, CURRENT_JSON)
+
+    written = write_if_changed(json_path, json.dumps(feed, ensure_ascii=False, separators=(",", ":")))
+    written |= write_if_changed(current_path, json.dumps(current_feed(feed), ensure_ascii=False, separators=(",", ":")))
+    if df is not None:
+        table = interval_table(df, index)[["interval"] + NUMERIC_KEYS]
+        written |= write_if_changed(csv_path, table.to_csv(index=False, lineterminator="\n"))
+
+    if written:
+        print(f"Feed files '{json_path}', '{current_path}' and '{csv_path}' have been generated.")
+    else:
+        print("Feed files are up to date.")
+
+
+def finish_run_report(args):
+    """
+    Append the current RunReport to --run-log, export it to --metrics-file
+    and print it with --timings.
+    """
+    report = run_report()
+    if args.run_log:
+        try:
+            report.write(args.run_log)
+        except OSError as e:
+            print(f"Could not write run log: {e}")
+    if args.metrics_file:
+        try:
+            import metrics
+            metrics.write_metrics(args.metrics_file, report.record())
+        except OSError as e:
+            print(f"Could not write metrics file: {e}")
+    if args.timings:
+        report.print_summary()
+
+
+def page_aggregates(df, index, output_file):
+    """
+    Day figures for the page at output_file, see aggregates.py. Errors
+    only cost the figures, never the page.
+    """
+    try:
+        import aggregates
+        return aggregates.day_aggregates(df, index, key=os.path.normpath(output_file))
+    except Exception as e:
+        print(f"Error while updating day aggregates: {e}")
+        return None
+
+
+def aggregates_html(figures):
+    import aggregates
+    return aggregates.format_html(figures)
+
+
+def page_rolling(df, row, index, archive_dir, output_file):
+    """
+    Rolling VP statistics and the anomaly flag for row on the page at
+    output_file, see rolling.py. Errors only cost the figures, never the
+    page.
+    """
+    try:
+        import rolling
+        return rolling.rolling_stats(df, row, index, archive_dir, key=os.path.normpath(output_file))
+    except Exception as e:
+        print(f"Error while updating rolling statistics: {e}")
+        return None
+
+
+def rolling_html(stats):
+    import rolling
+    return rolling.format_html(stats)
+
+
+def render_page(df, output_file="index.html", index=None, archive_dir=None):
+    """
+    Select the current time block from df (a DataFrame or DaySnapshot),
+    write the HTML page and the JSON/CSV feed next to it. archive_dir is
+    where rolling statistics catch up from after a gap.
+    """
+    report = run_report()
+    print("Selecting time block...")
+    with report.stage("select"):
+        now = datetime.now(prague_tz())
+        if df is not None and index is None:
+            index = build_interval_index(df)
+        row, fallback_msg = get_current_time_block(df, now, index)
+    if row is not None:
+        report.note("current_interval", str(row.get("Časový interval", "")))
+        report.note("current_values", {key: json_number(row.get(col)) for col, key in zip(NUMERIC_COLS, NUMERIC_KEYS)})
+    report.note("fallback", bool(fallback_msg))
+
+    sections = []
+    extras = {}
+    if df is not None:
+        with report.stage("chart"):
+            import chart
+            _, current = index.lookup(now, delivery_day_of(df))
+            sections.append(chart.day_chart(df, index, current))
+        with report.stage("aggregate"):
+            figures = page_aggregates(df, index, output_file)
+        sections.append(aggregates_html(figures))
+        extras["aggregates"] = figures
+        with report.stage("rolling"):
+            stats = page_rolling(df, row, index, archive_dir, output_file)
+        sections.append(rolling_html(stats))
+        extras["rolling"] = stats
+        report.note("anomaly", bool(stats and stats["anomaly"]))
+        with report.stage("resample"):
+            import resample
+            extras["products"] = resample.feed_products(df)
+
+    print("Generating HTML...")
+    with report.stage("render"):
+        written = generate_html(row, fallback_msg, output_file, sections=sections)
+    report.note("html_written", written)
+    with report.stage("feed"):
+        write_feed(df, row, fallback_msg, os.path.dirname(output_file) or ".", index, extras)
+
+
+def next_publication(now, publish_delay):
+    """
+    The next time OTE is expected to have published a quarter-hour update:
+    a quarter-hour boundary plus publish_delay, at or after now.
+    """
+    return next_quarter_hour(now - publish_delay) + publish_delay
+
+
+def run_daemon(args):
+    """
+    Resident mode: keep the interpreter, HTTP session and last parsed
+    day warm and wake just after each quarter-hour publication.
+    Each cycle polls with exponential backoff until a new workbook shows
+    up or the next publication is due, then re-renders the page. If nothing
+    new arrived, the warm day is re-used for the current time block.
+
+    The day is kept as a DaySnapshot rather than the parsed DataFrame,
+    which is dropped as soon as it has been converted.
+    """
+    from day_snapshot import DaySnapshot
+
+    cet_tz = prague_tz()
+    publish_delay = timedelta(minutes=args.publish_delay)
+    client = get_client(args.base_url)
+    day = None
+    marker = None
+
+    # Start with a parsed workbook in memory, even if the cache says
+    # the current one has been seen before
+    start_run_report().note("mode", "daemon")
+    try:
+        try:
+            df = fetch_and_process_data(client, backend=args.excel_backend)
+        except ReportNotModified:
+            df = fetch_and_process_data(client, use_cache=False, backend=args.excel_backend)
+        day = DaySnapshot.from_frame(df)
+        del df
+        marker = freshness_marker(day)
+        render_page(day, "index.html", archive_dir=args.archive_dir)
+    except FetchError as e:
+        print(e)
+    finish_run_report(args)
+
+    while True:
+        wake = next_publication(datetime.now(cet_tz), publish_delay)
+        print(f"Sleeping until {wake.strftime('%Y-%m-%d %H:%M:%S')} (CET)...")
+        time.sleep(max(0.0, (wake - datetime.now(cet_tz)).total_seconds()))
+
+        report = start_run_report()
+        report.note("mode", "daemon")
+        cycle_end = wake + timedelta(minutes=15)
+        delay = args.poll_interval
+        fresh = None
+        while True:
+            report.count("attempts")
+            try:
+                fresh = fetch_and_process_data(client, backend=args.excel_backend)
+                if is_fresh(freshness_marker(fresh), marker):
+                    break
+                print("Report changed, but no new interval yet.")
+            except ReportNotModified:
+                print("Report not updated yet.")
+            except FetchError as e:
+                print(e)
+
+            wait = jittered(delay)
+            remaining = (cycle_end - datetime.now(cet_tz)).total_seconds()
+            if remaining <= wait:
+                print("No new data this cycle.")
+                break
+            print(f"Polling again in {wait:.0f} seconds...")
+            with report.stage("wait"):
+                time.sleep(wait)
+            delay = min(delay * 2, args.poll_max_interval)
+
+        updated = fresh is not None
+        report.note("outcome", "updated" if updated else "stale")
+        if updated:
+            day = DaySnapshot.from_frame(fresh)
+            fresh = None
+            marker = freshness_marker(day)
+        if marker:
+            note_freshness(report, marker)
+            if not args.no_archive:
+                archive_report(day, args.archive_dir)
+            if args.db and updated:
+                store_report(day, args.db)
+
+        if day is not None:
+            render_page(day, "index.html", archive_dir=args.archive_dir)
+        finish_run_report(args)
+
+
+def main(argv=None):
     """
     Main entry point for updating the HTML file. Includes a retry mechanism:
-    If new data is not available, we wait 30s and try again, up to 3 times.
+    while the data is stale (the workbook is unchanged, or its latest
+    non-empty interval is the same as on the previous run), we retry with
+    jittered exponential backoff until --deadline. The newest workbook is
+    rendered at that point; if none was downloaded, nothing is re-rendered,
+    and pandas is never imported.
+    With --daemon, hands over to run_daemon instead of running once.
+    """
+    args = parse_args(argv)
+    if args.import_times:
+        print_import_cost_report()
+        return
+    if args.daemon:
+        run_daemon(args)
+        return
+
+    report = start_run_report()
+    try:
+        run_once(args, report)
+    finally:
+        finish_run_report(args)
+
+
+def run_once(args, report):
     """
-    max_retries = 3       # number of retry attempts
-    wait_seconds = 30     # seconds to wait between retries
+    One fetch/retry/render pass of main, recording into report.
+    """
+    client = get_client(args.base_url)
+    previous = load_cache().get("freshness")
+    deadline = time.monotonic() + args.deadline
+    delay = args.retry_delay
 
     df = None
+    marker = None
+    unchanged = False
+    attempt = 0
 
-    for attempt in range(1, max_retries + 1):
-        print(f"Fetch attempt {attempt} of {max_retries}...")
+    while True:
+        attempt += 1
+        report.count("attempts")
+        print(f"Fetch attempt {attempt}...")
         try:
-            df = fetch_and_process_data()
-        except Exception as e:
+            df = fetch_and_process_data(client, backend=args.excel_backend)
+            marker = freshness_marker(df)
+            if is_fresh(marker, previous):
+                print(f"Successfully fetched new data up to {marker['latest_interval']}.")
+                break
+            print(f"Report changed, but the latest interval is still {marker['latest_interval']}.")
+        except ReportNotModified as e:
+            unchanged = True
+            print(f"Report unchanged since last run: {e}")
+        except FetchError as e:
+            report.count("errors")
             print(f"Error during data fetch on attempt {attempt}: {e}")
-            df = None
 
-        # Simple check: if df is not empty, assume new data was fetched
-        if df is not None and not df.empty:
-            print("Successfully fetched new (non-empty) data.")
+        wait = jittered(delay)
+        if time.monotonic() + wait > deadline:
+            print("Data is still stale at the deadline; giving up.")
             break
+        print(f"No new data yet. Retrying in {wait:.1f} seconds...")
+        with report.stage("wait"):
+            time.sleep(wait)
+        delay = min(delay * 2, args.retry_max_delay)
 
-        # If data is empty or an error occurred, wait & retry
-        if attempt < max_retries:
-            print(f"No new data yet. Retrying in {wait_seconds} seconds...")
-            time.sleep(wait_seconds)
-        else:
-            print("No new data after all retries. Proceeding with fallback logic.")
+    if df is None:
+        if unchanged:
+            report.note("outcome", "unchanged")
+            note_freshness(report, previous)
+            print("Nothing new to render. Skipping render.")
+            return
+        report.note("outcome", "failed")
+        note_freshness(report, previous)
+        print("Could not fetch the report; leaving the page untouched.")
+        sys.exit(1)
 
-    print("Selecting time block...")
-    row, fallback_msg = get_current_time_block(df)
+    report.note("outcome", "fresh" if is_fresh(marker, previous) else "stale")
+    note_freshness(report, marker)
+    if not df.empty and not args.no_archive:
+        print("Archiving data...")
+        archive_report(df, args.archive_dir)
+    if not df.empty and args.db:
+        store_report(df, args.db)
 
-    print("Generating HTML...")
-    generate_html(row, fallback_msg, "index.html")
+    render_page(df, "index.html", archive_dir=args.archive_dir)
+    remember_freshness(marker)
     print("Done.")
 
 